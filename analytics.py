@@ -0,0 +1,237 @@
+import heapq
+import json
+import sys
+import time
+
+from autocomplete import normalize
+from timestamps import format_timestamp, is_legacy
+
+# -- Usage analytics --
+#   widget.py --stats                    print the cached analytics
+#   widget.py --stats --rebuild          recompute from the history store
+#   widget.py --stats-file old.json      analyse any history file (.json, .db, .jsonl, .csv)
+# Per-engine counts, a weekday x hour heatmap and the top queries, computed
+# in one streaming pass.  Memory is constant: engines and heatmap cells are
+# fixed in number, and top queries use the Space-Saving algorithm with a
+# fixed number of counters (exact while there are fewer distinct queries than
+# counters, otherwise each count is overestimated by at most its 'error').
+# The widget keeps the result in search_analytics.json and adds each new
+# search to it, so the full pass only runs once.
+
+TOP_CAPACITY = 1000  # Query counters kept by the top-queries sketch
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+SHADES = " .:-=+*#%@"  # Heatmap cells in the text report, from empty to busiest
+FORMAT_VERSION = 2
+
+
+class TopQueries:
+    """Space-Saving heavy hitters over normalized queries"""
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}  # key -> [count, error, display]
+        self._heap = []  # (count, key), with stale entries skipped lazily
+
+    def add(self, query):
+        key = normalize(query)
+        if not key:
+            return
+        counter = self.counters.get(key)
+        if counter is None:
+            floor = self._evict() if len(self.counters) >= self.capacity else 0
+            counter = self.counters[key] = [floor, floor, query]
+        counter[0] += 1
+        counter[2] = query.strip()
+        heapq.heappush(self._heap, (counter[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._reheap()
+
+    def _reheap(self):
+        """Drop stale heap entries"""
+        self._heap = [(c[0], k) for k, c in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def _evict(self):
+        """Remove the smallest counter and return its count"""
+        while True:
+            count, key = heapq.heappop(self._heap)
+            counter = self.counters.get(key)
+            if counter is not None and counter[0] == count:
+                del self.counters[key]
+                return count
+
+    def top(self, limit):
+        """[(display, count, error)] for the most frequent queries, by guaranteed count"""
+        ranked = sorted(self.counters.values(), key=lambda c: (c[0] - c[1], c[0]), reverse=True)[:limit]
+        return [(c[2], c[0], c[1]) for c in ranked]
+
+
+class Analytics:
+    """Incrementally updated engine, time-of-day and query statistics"""
+
+    def __init__(self, path=None, writer=None):
+        self.path = path
+        self.writer = writer
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.engines = {}
+        self.heatmap = [[0] * 24 for _ in WEEKDAYS]  # [weekday][hour], local time
+        self.top = TopQueries()
+        self.first = self.last = None  # Oldest and newest epoch timestamps seen
+        self.at_last = 0  # Entries counted with the newest timestamp
+
+    @classmethod
+    def load(cls, path, recent=(), stream=None, writer=None):
+        """Read the cached analytics and catch up on recent entries
+
+        Without a cache, returns None if stream is None, otherwise builds the
+        analytics in one pass over stream() and saves them.
+        """
+        analytics = cls(path, writer)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                analytics._restore(json.load(f))
+            if analytics.total and analytics.last is None:
+                raise ValueError("cached counts without timestamps")
+        except (OSError, ValueError, KeyError, TypeError):
+            if stream is None:
+                return None
+            analytics.rebuild(stream())
+            return analytics
+        missed = analytics._missed(recent)
+        if missed:
+            analytics.record(missed)
+        return analytics
+
+    def _missed(self, recent):
+        """Entries of recent (oldest first) not yet counted"""
+        if self.last is None:
+            return list(recent)  # Empty since created or cleared: everything is new
+        missed = []
+        skip = self.at_last  # Rows sharing the newest counted timestamp (a fan-out)
+        for entry in recent:
+            timestamp = entry[0]
+            if is_legacy(timestamp) or timestamp < self.last:
+                continue
+            if timestamp == self.last and skip:
+                skip -= 1
+                continue
+            missed.append(entry)
+        return missed
+
+    def add(self, entry):
+        """Count one (timestamp, engine, query) entry"""
+        timestamp, engine, query = entry[0], entry[1], entry[2]
+        self.total += 1
+        self.engines[engine] = self.engines.get(engine, 0) + 1
+        self.top.add(query)
+        if not is_legacy(timestamp):
+            moment = time.localtime(timestamp)
+            self.heatmap[moment.tm_wday][moment.tm_hour] += 1
+            if self.first is None or timestamp < self.first:
+                self.first = timestamp
+            if self.last is None or timestamp > self.last:
+                self.last = timestamp
+                self.at_last = 1
+            elif timestamp == self.last:
+                self.at_last += 1
+
+    def record(self, entries):
+        """Count new searches and schedule a save"""
+        for entry in entries:
+            self.add(entry)
+        self.save()
+
+    def rebuild(self, entries):
+        """Recompute from scratch in one pass over entries"""
+        self.reset()
+        for entry in entries:
+            self.add(entry)
+        self.save()
+
+    def clear(self):
+        """Forget everything (when history is cleared)"""
+        self.reset()
+        self.save()
+
+    # -- Persistence --
+    def save(self):
+        """Hand the analytics to the background writer (no-op without a path)"""
+        if self.path is None or self.writer is None:
+            return
+        self.writer.schedule(self.path, self._dumps)
+
+    def _dumps(self):
+        """Serialized analytics; runs on the writer thread"""
+        return json.dumps({
+            'version': FORMAT_VERSION,
+            'total': self.total,
+            'engines': dict(self.engines),
+            'heatmap': [list(row) for row in self.heatmap],
+            'top': [[k, *c] for k, c in list(self.top.counters.items())],
+            'first': self.first,
+            'last': self.last,
+            'at_last': self.at_last,
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    def _restore(self, data):
+        if data['version'] != FORMAT_VERSION:
+            raise ValueError("old analytics format")
+        self.total = data['total']
+        self.engines = dict(data['engines'])
+        self.heatmap = [list(row) for row in data['heatmap']]
+        self.top.counters = {key: [count, error, display] for key, count, error, display in data['top']}
+        self.top._reheap()
+        self.first, self.last, self.at_last = data['first'], data['last'], data['at_last']
+
+    # -- Reporting --
+    def engine_counts(self):
+        """[(engine, count)] busiest first"""
+        return sorted(self.engines.items(), key=lambda item: item[1], reverse=True)
+
+    def report_lines(self, top=10):
+        """Plain-text report used by the CLI and the analytics panel"""
+        lines = [f"{self.total} searches"
+                 + (f" from {format_timestamp(self.first)} to {format_timestamp(self.last)}"
+                    if self.first is not None else "")]
+        counts = self.engine_counts()
+        if counts:
+            lines += ["", "Engines:"]
+            widest = counts[0][1]
+            for engine, count in counts:
+                lines.append(f"  {engine:<24} {count:>8}  {'█' * max(1, round(20 * count / widest))}")
+        busiest = max(max(row) for row in self.heatmap)
+        if busiest:
+            lines += ["", "Weekday x hour:", "      " + "".join(f"{h:<3}" for h in range(0, 24, 3)).rstrip()]
+            for name, row in zip(WEEKDAYS, self.heatmap):
+                cells = "".join(SHADES[min(len(SHADES) - 1, -(-count * (len(SHADES) - 1) // busiest))]
+                                for count in row)
+                lines.append(f"  {name} {cells}")
+        queries = self.top.top(top)
+        if queries:
+            lines += ["", "Top queries:"]
+            for display, count, error in queries:
+                lines.append(f"  {count:>6}{'~' if error else ' '} {display}")
+        return lines
+
+
+def main(args):
+    """Entry point for --stats; returns the process exit code"""
+    if args.stats_file:
+        # Only the given file: the stored history and cache are left alone
+        from history_io import read_entries
+        analytics = Analytics()
+        try:
+            analytics.rebuild(read_entries(args.stats_file))
+        except Exception as e:
+            print(f"Cannot read {args.stats_file}: {e}", file=sys.stderr)
+            return 2
+    else:
+        import search_core
+        analytics = search_core.get_analytics()
+        if args.rebuild:
+            analytics.rebuild(search_core.iter_stored_history())
+    print("\n".join(analytics.report_lines(args.top)))
+    return 0
@@ -0,0 +1,119 @@
+import bisect
+import heapq
+import math
+
+# -- Frecency-ranked prefix index --
+# Each distinct query keeps a log-space frecency score: every use adds
+# exp(DECAY * seq), where seq is the position of the search in history.  Old
+# uses therefore weigh less than recent ones, yet the relative order of two
+# scores never changes as time passes, so cached top lists stay valid and only
+# need updating for the query that was just searched.
+
+HALF_LIFE = 200  # Searches after which a use counts half as much
+DECAY = math.log(2) / HALF_LIFE
+CACHE_DEPTH = 3  # Prefix lengths whose ranked results are precomputed
+SCAN_LIMIT = 256  # Longer prefixes matching more keys get their results cached
+TOP_K = 8  # Suggestions kept per cached prefix
+
+
+def normalize(query):
+    """Key used to group equivalent queries"""
+    return ' '.join(query.lower().split())
+
+
+def _add_log(a, b):
+    """log(exp(a) + exp(b)) without overflow"""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+class PrefixIndex:
+    """Sorted-array prefix index with cached top suggestions for short prefixes"""
+
+    def __init__(self, limit=TOP_K):
+        self.limit = limit
+        self.keys = []  # Sorted distinct normalized queries
+        self.scores = {}  # key -> log frecency score
+        self.counts = {}  # key -> number of uses
+        self.display = {}  # key -> most recent original spelling
+        self.seq = 0
+        self._top = {}  # prefix -> best keys, highest first
+
+    @classmethod
+    def from_usage(cls, usage, limit=TOP_K):
+        """Build the index from a UsageAggregate, which outlives the capped history"""
+        index = cls(limit)
+        for key, (display, count, score, _) in usage.query_totals().items():
+            index.scores[key] = score
+            index.counts[key] = count
+            index.display[key] = display
+        index.seq = usage.seq
+        index._build()
+        return index
+
+    def _build(self):
+        """Sort the keys and precompute the short-prefix top lists"""
+        self.keys = sorted(self.scores)
+        buckets = {}
+        for key in self.keys:
+            for n in range(min(len(key), CACHE_DEPTH) + 1):
+                buckets.setdefault(key[:n], []).append(key)
+        for prefix, keys in buckets.items():
+            self._top[prefix] = heapq.nlargest(self.limit, keys, key=self.scores.__getitem__)
+
+    def _bump(self, query):
+        """Record one use of a query and return its key"""
+        key = normalize(query)
+        if not key:
+            return None
+        weight = DECAY * self.seq
+        self.seq += 1
+        old = self.scores.get(key)
+        self.scores[key] = weight if old is None else _add_log(old, weight)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.display[key] = query.strip()
+        return key
+
+    def record(self, query):
+        """Add a search to the index, updating only the affected prefixes"""
+        is_new = normalize(query) not in self.scores
+        key = self._bump(query)
+        if key is None:
+            return
+        if is_new:
+            bisect.insort(self.keys, key)
+        score = self.scores[key]
+        for n in range(len(key) + 1):
+            prefix = key[:n]
+            top = self._top.get(prefix)
+            if top is None:
+                if n > CACHE_DEPTH:
+                    continue
+                top = self._top[prefix] = []
+            if key in top:
+                top.remove(key)
+            elif len(top) >= self.limit and self.scores[top[-1]] >= score:
+                continue
+            pos = len(top)
+            while pos and self.scores[top[pos - 1]] < score:
+                pos -= 1
+            top.insert(pos, key)
+            del top[self.limit:]
+
+    def suggest(self, text, limit=None):
+        """Best matching previous queries for what has been typed so far"""
+        limit = limit or self.limit
+        prefix = normalize(text)
+        if text.endswith(' ') and prefix:
+            prefix += ' '
+        if prefix in self._top or len(prefix) <= CACHE_DEPTH:
+            keys = self._top.get(prefix, [])[:limit]
+        else:
+            lo = bisect.bisect_left(self.keys, prefix)
+            hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+            top = heapq.nlargest(self.limit, self.keys[lo:hi], key=self.scores.__getitem__)
+            if hi - lo > SCAN_LIMIT:
+                self._top[prefix] = top
+            keys = top[:limit]
+        return [self.display[k] for k in keys if k != prefix]
@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instance
+from dispatch import open_searches
+from launcher import configure_launcher
+from search_core import ENGINES, ENGINES_FILE, build_searches, plan_search, read_settings_file, record_searches
+
+# -- Headless batch mode --
+#   widget.py --batch queries.txt [--engine so] [--concurrency 4] [--rate 2]
+#   some_command | widget.py --batch - --dry-run
+#   widget.py --batch queries.txt --launcher fake --no-history   launch throughput
+# Queries are streamed one line at a time through the same parsing, engine
+# resolution and history recording as the widget; nothing creates a window.
+# At most 2 x concurrency queries are in flight, so input of any size is
+# processed in constant memory.  A throughput summary goes to stderr.  While a
+# widget is running it owns the history, so recording batches is refused.
+
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_batch(lines, default_engine, concurrency=4, rate=0, dry_run=False, record=True,
+              out=None, err=None):
+    """Stream queries through the search pipeline; return the number of failures"""
+    out = out or sys.stdout
+    err = err or sys.stderr
+    interval = 1.0 / rate if rate > 0 else 0
+    slots = threading.BoundedSemaphore(max(1, concurrency) * 2)
+    lock = threading.Lock()
+    stats = {'queries': 0, 'searches': 0, 'failed': 0, 'latencies': []}
+    started = next_start = time.perf_counter()
+
+    def execute(searches):
+        begun = time.perf_counter()
+        try:
+            open_searches(searches, lambda status: None)
+            failed = 0
+        except Exception as e:
+            print(f"failed: {searches[0][2]!r}: {e}", file=err)
+            failed = 1
+        finally:
+            slots.release()
+        with lock:
+            stats['failed'] += failed
+            stats['latencies'].append(time.perf_counter() - begun)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for line in lines:
+            query, chosen = plan_search(line, default_engine)
+            if not query:
+                continue
+            searches = build_searches(query, chosen)
+            stats['queries'] += 1
+            stats['searches'] += len(searches)
+            if dry_run:
+                for search in searches:
+                    print(search[1], file=out)
+                continue
+            if interval:
+                delay = next_start - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_start = max(next_start, time.perf_counter() - interval) + interval
+            if record:
+                record_searches(query, chosen)
+            slots.acquire()
+            pool.submit(execute, searches)
+
+    elapsed = time.perf_counter() - started
+    latencies = sorted(stats['latencies'])
+    print(
+        f"{stats['queries']} queries ({stats['searches']} searches) in {elapsed:.2f}s: "
+        f"{stats['queries'] / elapsed if elapsed else 0:.1f} queries/s, {stats['failed']} failed"
+        + (f", latency p50 {_percentile(latencies, 0.5) * 1000:.1f} ms"
+           f" p99 {_percentile(latencies, 0.99) * 1000:.1f} ms" if latencies else ""),
+        file=err
+    )
+    return stats['failed']
+
+
+def main(args):
+    """Entry point for --batch; returns the process exit code"""
+    for error in ENGINES.errors:
+        print(f"{os.path.basename(ENGINES_FILE)}: {error}", file=sys.stderr)
+    key = args.engine if args.engine else read_settings_file().get('default_engine', 0) + 1
+    default_engine = ENGINES.get(key)
+    if default_engine is None:
+        print(f"Unknown engine: {args.engine}", file=sys.stderr)
+        return 2
+    record = not (args.no_history or args.dry_run)
+    if record and instance.running():
+        # Its next compaction would rewrite the history without our searches
+        print("A running widget owns the history: close it or pass --no-history", file=sys.stderr)
+        return 2
+    if args.launcher:
+        configure_launcher(dict(read_settings_file(), launcher=args.launcher))
+    if args.batch == "-":
+        lines = sys.stdin
+    else:
+        try:
+            lines = open(args.batch, 'r', encoding='utf-8')
+        except OSError as e:
+            print(f"Cannot read {args.batch}: {e}", file=sys.stderr)
+            return 2
+    with lines:
+        failed = run_batch(
+            lines, default_engine,
+            concurrency=args.concurrency, rate=args.rate,
+            dry_run=args.dry_run, record=record
+        )
+    return 1 if failed else 0
@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from engine_registry import EngineRegistry
+from history_buffer import HistoryBuffer
+from history_store import JournaledHistory
+from history_view import format_history_rows
+from launcher import DevToolsLauncher, FakeLauncher, WebbrowserLauncher
+from persistence import PersistenceWriter
+from query_parser import ShortcutTrie, parse_query
+from usage import UsageAggregate
+
+# -- Benchmarks --
+#   python bench.py                              all sizes, table on stderr
+#   python bench.py --sizes 100,10000 --out r.json
+#   python bench.py --baseline base.json         exit 1 on regressions
+# Times the widget's hot paths against generated histories of each size in a
+# temporary folder, so real history and settings are never touched and no
+# display is needed.  Results are JSON: one record per (benchmark, size) with
+# the best-of-N time in milliseconds.  Size-independent benchmarks (parsing,
+# engine resolution, URL building, browser launches) are recorded with size 0.
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000, 1000000)
+DEFAULT_TOLERANCE = 0.25  # Slowdown ratio above the baseline that counts as a regression
+REPEAT = 5  # Best-of repetitions per benchmark
+COLD_REPEAT = 3  # Interpreter launches per cold-start measurement
+PAGE_ROWS = 25  # Rows a history window page shows
+START_TIME = 1_600_000_000  # Epoch of the first generated search
+LAUNCHES = 200  # Searches per launch benchmark
+PROCESS_LAUNCHES = 20  # Fewer when each one starts an interpreter
+LAUNCH_TIMEOUT = 30.0
+HISTORY_CAPACITY = 100  # The widget's default max_history
+FAKE_BROWSER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_browser.py")
+
+WORDS = ("python", "rust", "async", "borrow", "checker", "docker", "compose", "lofi",
+         "beats", "weather", "recipe", "pasta", "linux", "kernel", "tkinter", "widget",
+         "sqlite", "index", "regex", "unicode", "café", "東京", "segfault", "traits")
+REGISTRY = EngineRegistry.load()  # Built-in engines only
+SHORTCUTS = ShortcutTrie.from_registry(REGISTRY)
+
+
+def generate_entries(count, seed=0):
+    """Deterministic (epoch time, engine label, query) history rows, a few minutes apart"""
+    rng = random.Random(seed)
+    labels = REGISTRY.labels
+    timestamp = START_TIME
+    entries = []
+    for _ in range(count):
+        timestamp += rng.randint(1, 600)
+        entries.append((float(timestamp), rng.choice(labels),
+                        " ".join(rng.choices(WORDS, k=rng.randint(1, 4)))))
+    return entries
+
+
+def best_of(func, number=1, repeat=REPEAT):
+    """Best time in ms for one call, averaged over number calls per repetition"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best * 1000
+
+
+# -- Size-independent benchmarks --
+def bench_parsing():
+    queries = ["rust traits !so", "!yt !w lofi beats", "!dev segfault",
+               "plain query without shortcuts", "rust traits`14"]
+    return best_of(lambda: [parse_query(q, SHORTCUTS) for q in queries], 200) / len(queries)
+
+
+def bench_engine_resolution():
+    keys = ["14", "so", "google", "ChatGPT", "unknown", 3]
+    return best_of(lambda: [REGISTRY.get(k) for k in keys], 2000) / len(keys)
+
+
+def bench_url_building():
+    engines = list(REGISTRY)
+    return best_of(lambda: [e.build_url("rust borrow checker café") for e in engines], 500) / len(engines)
+
+
+# -- Size-dependent benchmarks --
+def write_history(folder, entries):
+    """Write a compacted snapshot the way the widget stores it"""
+    with open(os.path.join(folder, "search_history.json"), 'w', encoding='utf-8') as f:
+        json.dump({'generation': 0, 'entries': entries}, f)
+
+
+def bench_load(folder):
+    path = os.path.join(folder, "search_history.json")
+    return best_of(lambda: JournaledHistory(path).load(), repeat=3)
+
+
+def bench_save_per_search(folder, count=200):
+    """Append searches through the journal and usage aggregate, including any compaction"""
+    work = os.path.join(folder, "save")
+    os.makedirs(work, exist_ok=True)
+    shutil.copy(os.path.join(folder, "search_history.json"), work)
+    writer = PersistenceWriter(window=0)
+    store = JournaledHistory(os.path.join(work, "search_history.json"),
+                             capacity=HISTORY_CAPACITY, writer=writer)
+    usage = UsageAggregate.load(os.path.join(work, "search_usage.json"), store.load(), writer)
+    entries = generate_entries(count, seed=1)
+    writer.flush()  # Time the searches, not the initial usage snapshot
+    started = time.perf_counter()
+    for entry in entries:
+        store.append(entry)
+        usage.record((entry,))
+    ms = (time.perf_counter() - started) * 1000 / count
+    writer.close()
+    store.close()
+    usage.close()
+    return ms
+
+
+def bench_history_page(entries):
+    """Format the first and a middle page of the history window"""
+    history = HistoryBuffer(entries=entries)
+    middle = len(history) // 2
+    return best_of(lambda: (format_history_rows(history, 0, min(PAGE_ROWS, len(history))),
+                            format_history_rows(history, middle, min(middle + PAGE_ROWS, len(history)))),
+                   50)
+
+
+def bench_date_range(entries):
+    """Entries from the last week of history through the day index"""
+    history = HistoryBuffer(entries=entries)
+    end = history[-1][0] + 1 if entries else START_TIME
+    return best_of(lambda: history.between(end - 7 * 86400, end), 5)
+
+
+def bench_cold_start(folder, module):
+    """Wall time of a fresh interpreter importing module against this history"""
+    env = dict(os.environ, SEARCH_WIDGET_HOME=folder)
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = float('inf')
+    for _ in range(COLD_REPEAT):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=here, env=env, check=True)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+# -- Browser launch benchmarks (against fake_browser.py, no real browser) --
+def _wait_for_lines(path, count, timeout=LAUNCH_TIMEOUT):
+    """Block until the fake browser has logged count URLs"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if sum(1 for _ in f) >= count:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.002)
+    raise TimeoutError(f"fake browser logged fewer than {count} URLs")
+
+
+def bench_launch(launcher, log_path=None, count=LAUNCHES):
+    """ms per search from launch until the browser has the URL"""
+    urls = [f"https://example.com/search?q={n}" for n in range(count)]
+    started = time.perf_counter()
+    for url in urls:
+        launcher.open(url)
+    if log_path:
+        _wait_for_lines(log_path, count)
+    return (time.perf_counter() - started) * 1000 / count
+
+
+def bench_launch_process(folder):
+    """A fake browser process spawned per search, as without a DevTools session"""
+    log_path = os.path.join(folder, "process.log")
+    launcher = WebbrowserLauncher([sys.executable, FAKE_BROWSER, "--log", log_path])
+    return bench_launch(launcher, log_path, PROCESS_LAUNCHES)
+
+
+def bench_launch_devtools(folder):
+    """Tabs opened over one kept-alive DevTools connection to a running fake browser"""
+    log_path = os.path.join(folder, "devtools.log")
+    browser = subprocess.Popen(
+        [sys.executable, FAKE_BROWSER, "--log", log_path, "--remote-debugging-port=0"],
+        stderr=subprocess.PIPE, text=True)
+    try:
+        port = int(browser.stderr.readline().rsplit(":", 1)[1].split("/")[0])
+        launcher = DevToolsLauncher(port, fallback=FakeLauncher())
+        if not launcher.check():
+            raise RuntimeError("fake browser DevTools endpoint not reachable")
+        ms = bench_launch(launcher, log_path)
+        if launcher.fallback.count:
+            raise RuntimeError("DevTools launches fell back")
+        launcher.close()
+        return ms
+    finally:
+        browser.terminate()
+        browser.wait()
+
+
+def run(sizes, cold=True, log=None):
+    """Run every benchmark; return the result records"""
+    log = log or sys.stderr
+    results = []
+
+    def add(name, size, ms):
+        results.append({'name': name, 'size': size, 'ms': round(ms, 6)})
+        print(f"{name:>20} {size:>9}  {ms:10.3f} ms", file=log, flush=True)
+
+    add("parse_query", 0, bench_parsing())
+    add("engine_resolution", 0, bench_engine_resolution())
+    add("build_url", 0, bench_url_building())
+    folder = tempfile.mkdtemp(prefix="widget-bench-")
+    try:
+        add("launch_fake", 0, bench_launch(FakeLauncher()))
+        add("launch_process", 0, bench_launch_process(folder))
+        add("launch_devtools", 0, bench_launch_devtools(folder))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    for size in sizes:
+        folder = tempfile.mkdtemp(prefix="widget-bench-")
+        try:
+            entries = generate_entries(size)
+            write_history(folder, entries)
+            add("load_history", size, bench_load(folder))
+            add("save_per_search", size, bench_save_per_search(folder))
+            add("history_page", size, bench_history_page(entries))
+            add("date_range_week", size, bench_date_range(entries))
+            if cold:
+                add("cold_import_core", size, bench_cold_start(folder, "search_core"))
+                add("cold_import_widget", size, bench_cold_start(folder, "widget"))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, out=None):
+    """Print the change against a baseline; return the regressed records"""
+    out = out or sys.stderr
+    previous = {(r['name'], r['size']): r['ms'] for r in baseline.get('results', [])}
+    regressions = []
+    print(f"== Against baseline (tolerance {tolerance:.0%}) ==", file=out)
+    for r in results:
+        before = previous.get((r['name'], r['size']))
+        if not before:
+            continue
+        ratio = r['ms'] / before
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(r)
+        print(f"{r['name']:>20} {r['size']:>9}  {before:10.3f} -> {r['ms']:10.3f} ms  x{ratio:.2f}{flag}",
+              file=out)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search widget's hot paths")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated history sizes")
+    parser.add_argument("--no-cold", action="store_true", help="skip the cold-start benchmarks")
+    parser.add_argument("--out", metavar="FILE", help="write the JSON results to FILE ('-' for stdout)")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against saved results")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown before flagging (default {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'results': run(sizes, cold=not args.no_cold),
+    }
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report['results'], baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import argparse
+
+import instance
+from launcher import LAUNCHERS
+from loop_profile import STALL_MS
+
+# -- Command line --
+# Every option of the widget and its headless modes, registered here so that
+# parsing the command line imports nothing but this module and the small ones
+# above.  The mode that handles the options (batch.py, analytics.py,
+# history_io.py) is only imported once run_headless picks it, so a normal GUI
+# launch never loads them.
+
+
+def add_batch_arguments(parser):
+    """Register the batch mode command line options"""
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run queries from FILE (one per line, '-' for stdin) without the UI")
+    parser.add_argument("--engine", metavar="KEY",
+                        help="engine for --query or batch queries (position, id or alias)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="searches dispatched in parallel (default 4)")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="maximum queries per second (default unlimited)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the URLs instead of opening them")
+    parser.add_argument("--no-history", action="store_true",
+                        help="do not record batch queries in history")
+    parser.add_argument("--launcher", choices=LAUNCHERS,
+                        help="browser launcher backend (default: the 'launcher' setting)")
+
+
+def add_analytics_arguments(parser):
+    """Register the analytics command line options"""
+    parser.add_argument("--stats", action="store_true",
+                        help="print engine, time-of-day and top-query statistics and exit")
+    parser.add_argument("--stats-file", metavar="FILE",
+                        help="compute the statistics from a history file (.json, .db, .jsonl or .csv)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="with --stats, recompute the cached statistics from the history store")
+    parser.add_argument("--top", type=int, default=10, help="top queries to show (default 10)")
+
+
+def add_history_io_arguments(parser):
+    """Register the import, export and merge command line options"""
+    parser.add_argument("--export", metavar="FILE",
+                        help="write the stored history to FILE (.jsonl, .csv or .json) and exit")
+    parser.add_argument("--import", dest="import_files", nargs="+", metavar="FILE",
+                        help="merge history files (.jsonl, .csv, .json or .db) into the "
+                             "stored history and exit")
+    parser.add_argument("--merge", nargs="+", metavar="FILE",
+                        help="merge history files into --out, dropping duplicates, and exit")
+    parser.add_argument("--out", metavar="FILE", help="output file for --merge ('-' for stdout)")
+
+
+def parse_args(argv=None):
+    """Command line options for the widget and its headless modes"""
+    parser = argparse.ArgumentParser(description="Premium Search Widget")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print import and startup phase timings")
+    parser.add_argument("--profile-loop", action="store_true",
+                        help="time every Tk callback and report stalls on exit")
+    parser.add_argument("--stall-ms", type=float, default=STALL_MS,
+                        help=f"stall threshold for --profile-loop (default {STALL_MS} ms)")
+    instance.add_arguments(parser)
+    add_batch_arguments(parser)
+    add_analytics_arguments(parser)
+    add_history_io_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run_headless(args):
+    """Run the headless mode args ask for and return its exit code; None for the GUI"""
+    if args.batch:
+        import batch
+        return batch.main(args)
+    if args.stats or args.stats_file:
+        import analytics
+        return analytics.main(args)
+    if args.export or args.import_files or args.merge:
+        import history_io
+        return history_io.main(args)
+    return None
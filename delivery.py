@@ -0,0 +1,132 @@
+# -- Prompt delivery --
+# How a query reaches the engine is chosen per engine ("delivery" in
+# engine_registry.py):
+#   "url"     - regular search URL, the query is part of the address
+#   "prefill" - AI page that accepts the prompt as a URL parameter, no typing
+#   "paste"   - wait for the page, then paste the whole prompt from the clipboard
+#   "type"    - wait for the page, then type the prompt key by key (last resort)
+# Only "type" takes time proportional to the query length.  Pasting puts the
+# user's own clipboard contents back once the paste keystroke has been sent.
+
+import time
+
+URL_STRATEGIES = ("url", "prefill")
+PAGE_STRATEGIES = ("paste", "type")
+RESTORE_DELAY = 0.2  # Seconds the page gets to read the clipboard before it is restored
+
+
+def copy_to_clipboard(text):
+    """Put text on the system clipboard; return False if no backend is available"""
+    try:
+        import win32clipboard
+        import win32con
+    except ImportError:
+        win32clipboard = None
+    if win32clipboard:
+        try:
+            win32clipboard.OpenClipboard()
+            try:
+                win32clipboard.EmptyClipboard()
+                win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
+            finally:
+                win32clipboard.CloseClipboard()
+            return True
+        except Exception:
+            return False
+    try:
+        import pyperclip
+        pyperclip.copy(text)
+        return True
+    except Exception:
+        return False
+
+
+def save_clipboard():
+    """The clipboard contents, for restore_clipboard; None if they cannot be read
+
+    With pywin32 every format that can be copied out is kept, otherwise only text.
+    """
+    try:
+        import win32clipboard
+    except ImportError:
+        win32clipboard = None
+    if win32clipboard:
+        try:
+            win32clipboard.OpenClipboard()
+            try:
+                saved = []
+                fmt = win32clipboard.EnumClipboardFormats(0)
+                while fmt:
+                    try:
+                        saved.append((fmt, win32clipboard.GetClipboardData(fmt)))
+                    except Exception:
+                        pass  # Handle-based formats such as bitmaps cannot be copied out
+                    fmt = win32clipboard.EnumClipboardFormats(fmt)
+            finally:
+                win32clipboard.CloseClipboard()
+            return saved
+        except Exception:
+            return None
+    try:
+        import pyperclip
+        return pyperclip.paste()
+    except Exception:
+        return None
+
+
+def restore_clipboard(saved):
+    """Put back contents returned by save_clipboard"""
+    if saved is None:
+        return
+    if isinstance(saved, str):
+        copy_to_clipboard(saved)
+        return
+    import win32clipboard
+    try:
+        win32clipboard.OpenClipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+            for fmt, data in saved:
+                try:
+                    win32clipboard.SetClipboardData(fmt, data)
+                except Exception:
+                    pass
+        finally:
+            win32clipboard.CloseClipboard()
+    except Exception:
+        pass
+
+
+def paste_prompt(query, progress):
+    """Paste the prompt in one keystroke; return False if the clipboard is unusable"""
+    saved = save_clipboard()
+    if not copy_to_clipboard(query):
+        return False
+    import pyautogui
+    progress("pasting")
+    try:
+        pyautogui.click(x=500, y=500)
+        pyautogui.hotkey("ctrl", "v")
+        time.sleep(RESTORE_DELAY)
+    finally:
+        restore_clipboard(saved)
+    pyautogui.press("enter")
+    return True
+
+
+def type_prompt(query, progress):
+    """Type the prompt one key at a time"""
+    import pyautogui
+    progress("typing")
+    pyautogui.click(x=500, y=500)
+    pyautogui.write(query)
+    pyautogui.press("enter")
+    return True
+
+
+def deliver_prompt(strategy, query, progress):
+    """Deliver a prompt into a ready page, falling back from paste to typing"""
+    if strategy == "paste" and paste_prompt(query, progress):
+        return "paste"
+    type_prompt(query, progress)
+    return "type"
@@ -0,0 +1,37 @@
+import threading
+from collections import deque
+
+# -- Latency diagnostics --
+# Rolling latency samples (seconds) with percentile summaries, shown in the
+# widget's diagnostics window.
+
+
+class LatencyRecorder:
+    """Keeps the most recent samples of one latency measurement"""
+
+    def __init__(self, name, maxlen=1000):
+        self.name = name
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0  # Samples ever recorded
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """Add one sample"""
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, fraction):
+        """Nearest-rank percentile of the kept samples, or None if empty"""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """One line: count, p50, p99 and max in milliseconds"""
+        if not self.samples:
+            return f"{self.name}: no samples yet"
+        p50, p99, worst = (self.percentile(f) * 1000 for f in (0.5, 0.99, 1.0))
+        return f"{self.name}: n={self.count}  p50 {p50:.1f} ms  p99 {p99:.1f} ms  max {worst:.1f} ms"
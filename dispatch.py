@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+
+from delivery import PAGE_STRATEGIES, deliver_prompt
+from launcher import open_url, open_urls
+from readiness import READY_TIMEOUT, SETTLE_DELAY, WaitStats, default_probe, wait_until_ready
+
+# -- Search dispatch --
+# Browser launches and AI prompt injection run on a single worker thread so the
+# Tk event loop never blocks.  Jobs run strictly in submission order: opening
+# a page while a prompt is being typed would steal focus from the AI tab.
+# Progress events are put on a queue that the Tk loop drains with after().
+# A fan-out job opens all of its URL-delivered searches (including prefilled
+# AI prompts) with one browser launch; engines that need the prompt pasted or
+# typed follow one at a time, since they each need keyboard focus.
+
+FOCUS_LOCK = threading.Lock()  # Serializes prompt injection across threads
+
+
+def wait_for_page(label, probe, stats, timeout, progress):
+    """Block until the AI page is ready, learning how long it usually takes
+
+    With a probe, the learned wait is the first polling budget and the rest
+    of timeout a second one; every observed wait is recorded.  A page that
+    never reports ready still gets the prompt, with a progress note.
+    """
+    progress("waiting")
+    expected = stats.expected(label)
+    if probe is None:
+        time.sleep(expected)
+        return
+    started = time.monotonic()
+    if wait_until_ready(probe, expected) is None:
+        progress("still waiting")
+        if wait_until_ready(probe, max(0.0, timeout - expected)) is None:
+            progress(f"not ready after {max(timeout, expected):g}s, delivering anyway")
+            return
+    stats.record(label, time.monotonic() - started)
+    time.sleep(SETTLE_DELAY)
+
+
+def open_search(label, url, query, delivery, progress, probe=None, stats=None,
+                timeout=READY_TIMEOUT):
+    """Open a search URL and deliver the query using the engine's strategy"""
+    progress("opening")
+    if delivery in PAGE_STRATEGIES:
+        stats = stats or WaitStats()
+        with FOCUS_LOCK:
+            if probe:
+                probe.start(label.split()[0])
+            open_url(url)
+            wait_for_page(label, probe, stats, timeout, progress)
+            deliver_prompt(delivery, query, progress)
+    else:
+        open_url(url)
+
+
+def open_searches(searches, progress, probe=None, stats=None, timeout=READY_TIMEOUT):
+    """Run a fan-out of (label, url, query, delivery) searches"""
+    batch = [url for label, url, query, delivery in searches if delivery not in PAGE_STRATEGIES]
+    if len(batch) > 1:
+        progress(f"opening {len(batch)} tabs")
+        open_urls(batch)
+    for label, url, query, delivery in searches:
+        if delivery in PAGE_STRATEGIES or len(batch) == 1:
+            open_search(label, url, query, delivery, progress, probe, stats, timeout)
+
+
+class SearchDispatcher:
+    """FIFO worker that runs search jobs off the UI thread"""
+
+    def __init__(self, probe=None, stats=None, timeout=READY_TIMEOUT):
+        self.probe = probe
+        self.stats = stats or WaitStats()
+        self.timeout = timeout
+        self.jobs = queue.Queue()
+        self.events = queue.Queue()  # (job_id, label, status) for the UI thread
+        self.pending = 0
+        self._next_id = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, label, url, query, delivery="url"):
+        """Queue a search and return its job id"""
+        return self.submit_batch(label, [(label, url, query, delivery)])
+
+    def submit_batch(self, label, searches):
+        """Queue several (label, url, query, delivery) searches as one job"""
+        self._next_id += 1
+        self.pending += 1
+        self.jobs.put((self._next_id, label, searches))
+        self.events.put((self._next_id, label, "queued"))
+        return self._next_id
+
+    def _run(self):
+        """Worker loop: run queued jobs one at a time"""
+        if self.probe is None:
+            self.probe = default_probe()  # Loads pywin32 off the UI thread
+        while True:
+            job_id, label, searches = self.jobs.get()
+            report = lambda status: self.events.put((job_id, label, status))
+            try:
+                open_searches(searches, report, self.probe, self.stats, self.timeout)
+                report("done")
+            except Exception as e:
+                report(f"failed: {e}")
+
+    def drain(self):
+        """Collect progress events; call from the UI thread only"""
+        events = []
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return events
+            if event[2] == "done" or event[2].startswith("failed"):
+                self.pending -= 1
+            events.append(event)
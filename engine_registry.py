@@ -0,0 +1,207 @@
+import json
+from urllib.parse import quote, quote_plus, urlsplit
+
+# -- Engine registry --
+# Engines are defined once (built-in defaults, optionally extended or
+# overridden by a user engines.json) and indexed by position, id, alias and
+# display label, so every lookup is a dict access regardless of how many
+# engines exist.  URL templates are split around their "{}" placeholder when
+# loaded and pick the right percent-encoding for where the query goes:
+# quote_plus inside the query string, path-safe quote inside the path.
+#
+# engines.json is a list of objects, e.g.
+#   [{"id": "mdn", "name": "MDN", "icon": "📖", "aliases": ["mdn"],
+#     "url": "https://developer.mozilla.org/search?q={}"},
+#    {"id": "snapchat", "disabled": true}]
+# Entries whose id matches a built-in engine override or disable it; the
+# rest are appended.  "delivery" defaults to "url" (see delivery.py).
+# To also define engine groups for fan-out searches ("!dev query" searches
+# every engine in the group) use an object instead of a list:
+#   {"engines": [...], "groups": {"dev": ["google", "stackoverflow", "reddit"]}}
+
+DEFAULT_ENGINES = [
+    {"id": "google", "name": "Google", "icon": "🔍", "aliases": ["g"],
+     "url": "https://www.google.com/search?q={}"},
+    {"id": "youtube", "name": "YouTube", "icon": "▶️", "aliases": ["yt"],
+     "url": "https://www.youtube.com/results?search_query={}"},
+    {"id": "chatgpt", "name": "ChatGPT", "icon": "🤖", "aliases": ["gpt", "ai"],
+     "url": "https://chatgpt.com/?q={}", "delivery": "prefill"},
+    {"id": "gemini", "name": "Gemini", "icon": "🌟", "aliases": ["gem"],
+     "url": "https://gemini.google.com/", "delivery": "paste"},
+    {"id": "bing", "name": "Bing", "icon": "🌀", "aliases": ["b"],
+     "url": "https://www.bing.com/search?q={}"},
+    {"id": "facebook", "name": "Facebook", "icon": "📘", "aliases": ["fb"],
+     "url": "https://www.facebook.com/search/top/?q={}"},
+    {"id": "linkedin", "name": "LinkedIn", "icon": "💼", "aliases": ["li"],
+     "url": "https://www.linkedin.com/search/results/all/?keywords={}"},
+    {"id": "instagram", "name": "Instagram", "icon": "📸", "aliases": ["ig"],
+     "url": "https://www.instagram.com/explore/tags/{}/"},
+    {"id": "twitter", "name": "Twitter", "icon": "🐦", "aliases": ["tw", "x"],
+     "url": "https://twitter.com/search?q={}"},
+    {"id": "reddit", "name": "Reddit", "icon": "👽", "aliases": ["r"],
+     "url": "https://www.reddit.com/search/?q={}"},
+    {"id": "pinterest", "name": "Pinterest", "icon": "📌", "aliases": ["pin"],
+     "url": "https://www.pinterest.com/search/pins/?q={}"},
+    {"id": "quora", "name": "Quora", "icon": "❓", "aliases": ["q"],
+     "url": "https://www.quora.com/search?q={}"},
+    {"id": "amazon", "name": "Amazon", "icon": "🛒", "aliases": ["a", "amz"],
+     "url": "https://www.amazon.com/s?k={}"},
+    {"id": "stackoverflow", "name": "StackOverflow", "icon": "💡", "aliases": ["so"],
+     "url": "https://stackoverflow.com/search?q={}"},
+    {"id": "wikipedia", "name": "Wikipedia", "icon": "📚", "aliases": ["w", "wiki"],
+     "url": "https://en.wikipedia.org/wiki/{}"},
+    {"id": "duckduckgo", "name": "DuckDuckGo", "icon": "🔐", "aliases": ["ddg"],
+     "url": "https://duckduckgo.com/?q={}"},
+    {"id": "yahoo", "name": "Yahoo", "icon": "🗞️", "aliases": ["y"],
+     "url": "https://search.yahoo.com/search?p={}"},
+    {"id": "snapchat", "name": "Snapchat", "icon": "👻", "aliases": ["sc"],
+     "url": "https://www.snapchat.com/add/{}"},
+    {"id": "spotify", "name": "Spotify", "icon": "🎵", "aliases": ["sp"],
+     "url": "https://open.spotify.com/search/{}"},
+    {"id": "netflix", "name": "Netflix", "icon": "🍿", "aliases": ["nf"],
+     "url": "https://www.netflix.com/search?q={}"},
+]
+
+DEFAULT_GROUPS = {
+    "dev": ["google", "stackoverflow", "reddit"],
+}
+
+
+def _path_quote(text):
+    return quote(text, safe='')
+
+
+class Engine:
+    """A search engine with a precompiled URL template"""
+
+    __slots__ = ('position', 'id', 'name', 'icon', 'url', 'delivery', 'aliases',
+                 'label', 'title', '_prefix', '_suffix', '_quote')
+
+    def __init__(self, position, id, name, url, icon="", delivery="url", aliases=()):
+        self.position = position  # 1-based, as shown in the dropdown
+        self.id = id
+        self.name = name
+        self.icon = icon
+        self.url = url
+        self.delivery = delivery
+        self.aliases = tuple(a.lower() for a in aliases)
+        self.title = f"{name} {icon}".strip()
+        self.label = f"{position}. {self.title}"
+        self._prefix, placeholder, self._suffix = url.partition("{}")
+        if not placeholder:
+            self._prefix, self._suffix, self._quote = url, "", None
+        elif "?" in self._prefix or "#" in self._prefix:
+            self._quote = quote_plus
+        else:
+            self._quote = _path_quote
+
+    def build_url(self, query):
+        """URL for a query, percent-encoded for the placeholder's position"""
+        if self._quote is None:
+            return self._prefix
+        return self._prefix + self._quote(query) + self._suffix
+
+    def __repr__(self):
+        return f"Engine({self.label!r})"
+
+
+class EngineGroup:
+    """A saved set of engines searched together"""
+
+    __slots__ = ('name', 'engines')
+
+    def __init__(self, name, engines):
+        self.name = name
+        self.engines = tuple(engines)
+
+    def __repr__(self):
+        return f"EngineGroup({self.name!r}, {[e.id for e in self.engines]})"
+
+
+class EngineRegistry:
+    """Engines indexed for O(1) lookup by position, id, alias or label"""
+
+    def __init__(self, definitions, groups=None):
+        self.engines = []
+        self.errors = []
+        self._index = {}
+        for definition in definitions:
+            try:
+                self._add(definition)
+            except (KeyError, TypeError, ValueError) as e:
+                self.errors.append(f"{definition!r}: {e}")
+        self.labels = [engine.label for engine in self.engines]
+        self.groups = {}
+        for name, members in (DEFAULT_GROUPS if groups is None else groups).items():
+            found = [self.get(m) for m in members]
+            if None in found or not found:
+                self.errors.append(f"group {name!r}: unknown engine in {members!r}")
+                continue
+            self.groups[name.lower()] = EngineGroup(name.lower(), found)
+
+    def _add(self, definition):
+        """Create an engine and index every name it can be found by"""
+        if not urlsplit(definition['url']).scheme:
+            raise ValueError("url needs a scheme such as https://")
+        engine = Engine(
+            len(self.engines) + 1,
+            str(definition['id']).lower(),
+            definition['name'],
+            definition['url'],
+            icon=definition.get('icon', ""),
+            delivery=definition.get('delivery', "url"),
+            aliases=definition.get('aliases', ()),
+        )
+        self.engines.append(engine)
+        for key in (engine.label, engine.id, *engine.aliases):
+            self._index.setdefault(key.lower(), engine)
+
+    @classmethod
+    def load(cls, path=None):
+        """Built-in engines merged with the user's engines.json, if any"""
+        definitions = {d['id']: d for d in DEFAULT_ENGINES}
+        groups = dict(DEFAULT_GROUPS)
+        errors = []
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    custom = json.load(f)
+            except FileNotFoundError:
+                custom = []
+            except (OSError, ValueError) as e:
+                custom = []
+                errors.append(f"{path}: {e}")
+            if isinstance(custom, dict):
+                groups.update(custom.get('groups', {}))
+                custom = custom.get('engines', [])
+            for definition in custom if isinstance(custom, list) else []:
+                if not isinstance(definition, dict) or 'id' not in definition:
+                    errors.append(f"{definition!r}: missing id")
+                    continue
+                key = str(definition['id']).lower()
+                if definition.get('disabled'):
+                    definitions.pop(key, None)
+                else:
+                    definitions[key] = {**definitions.get(key, {}), **definition}
+        registry = cls(definitions.values(), groups)
+        registry.errors[:0] = errors
+        return registry
+
+    def get(self, key):
+        """Engine by 1-based position, id, alias or label; None if unknown"""
+        if isinstance(key, int):
+            return self.engines[key - 1] if 1 <= key <= len(self.engines) else None
+        key = key.strip().lower()
+        if key.isdigit():
+            return self.get(int(key))
+        return self._index.get(key)
+
+    def __getitem__(self, position):
+        """Engine by 0-based index (as used by the dropdown and settings)"""
+        return self.engines[position]
+
+    def __len__(self):
+        return len(self.engines)
+
+    def __iter__(self):
+        return iter(self.engines)
@@ -0,0 +1,107 @@
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+# -- Stand-in browser --
+#   python fake_browser.py --log urls.txt URL...                 "open" URLs and exit
+#   python fake_browser.py --log urls.txt --remote-debugging-port=9222
+# Behaves enough like a Chromium browser for launcher tests and benchmarks
+# without opening anything: URLs from the command line, or from PUT /json/new
+# on the DevTools endpoint, are appended to the --log file one per line.  Like
+# Chromium it prints "DevTools listening on ws://..." to stderr once serving
+# (port 0 picks a free port).  --drop-replies opens each tab but hangs up
+# instead of answering, like a browser whose connection drops mid-request.
+
+HOST = "127.0.0.1"
+
+
+class Browser:
+    """Tabs opened so far, written to the log as they are opened"""
+
+    def __init__(self, log_path, drop_replies=False):
+        self.log = open(log_path, 'a', encoding='utf-8') if log_path else None
+        self.drop_replies = drop_replies  # Close the connection instead of answering /json/new
+        self.tabs = 0
+        self._lock = threading.Lock()
+
+    def open(self, url):
+        with self._lock:
+            self.tabs += 1
+            if self.log:
+                self.log.write(url + '\n')
+                self.log.flush()
+            return str(self.tabs)
+
+
+def make_handler(browser):
+    class DevToolsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep connections alive like Chromium
+        disable_nagle_algorithm = True
+
+        def reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/json/version":
+                self.reply(200, {'Browser': "FakeBrowser/1.0", 'Protocol-Version': "1.3"})
+            elif self.path.startswith("/json/new"):
+                self.reply(405, "Using unsafe HTTP verb GET to invoke /json/new")
+            else:
+                self.reply(404, "Unknown command")
+
+        def do_PUT(self):
+            path, _, query = self.path.partition("?")
+            if path == "/json/new":
+                url = unquote(query) or "about:blank"
+                target = browser.open(url)
+                if browser.drop_replies:
+                    self.close_connection = True  # Tab opened, but the answer never arrives
+                    return
+                self.reply(200, {'id': target, 'type': "page", 'url': url})
+            elif path.startswith("/json/activate/"):
+                self.reply(200, "Target activated")
+            else:
+                self.reply(404, "Unknown command")
+
+        def log_message(self, format, *args):
+            pass
+
+    return DevToolsHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in browser for launcher tests")
+    parser.add_argument("--log", metavar="FILE", help="append opened URLs to FILE")
+    parser.add_argument("--remote-debugging-port", type=int, metavar="PORT",
+                        help="serve a DevTools endpoint on PORT (0 for any free port)")
+    parser.add_argument("--drop-replies", action="store_true",
+                        help="open tabs for PUT /json/new but drop the connection instead of answering")
+    parser.add_argument("urls", nargs="*")
+    args = parser.parse_args(argv)
+
+    browser = Browser(args.log, args.drop_replies)
+    for url in args.urls:
+        browser.open(url)
+    if args.remote_debugging_port is None:
+        return 0
+    server = ThreadingHTTPServer((HOST, args.remote_debugging_port), make_handler(browser))
+    server.daemon_threads = True
+    print(f"DevTools listening on ws://{HOST}:{server.server_address[1]}/devtools/browser/fake",
+          file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
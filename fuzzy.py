@@ -0,0 +1,149 @@
+import itertools
+
+from autocomplete import normalize
+
+# -- Typo-tolerant matching --
+# Symmetric-delete index over the distinct words of past queries.  Every word
+# is stored under each string obtainable by deleting up to max_edits(word)
+# characters; a typed word looks up its own deletes, so candidate words are
+# found with a handful of dict lookups whatever the vocabulary size, then
+# verified with an exact edit distance.  Queries are found through per-word
+# posting sets: a query matches when every typed word is close to one of its
+# words.  Indexing words rather than whole queries keeps the delete table
+# small (a vocabulary of thousands, not one entry per query variant).  When
+# more than MAX_CANDIDATES queries match, the ones scored are picked in a
+# fixed order: through the closest words first, then by how often each query
+# was used, so results never depend on set iteration order.
+#   "wat is tuotmind"  ->  "what is tutomind"
+
+MAX_CANDIDATES = 2000  # Queries scored per lookup, so lookups stay bounded
+MIN_FUZZY_LENGTH = 3  # Shorter words must match exactly
+
+
+def max_edits(word):
+    """Typos tolerated in a word of this length"""
+    if len(word) < MIN_FUZZY_LENGTH:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def _deletes(word, depth):
+    """Word plus every string with up to depth characters deleted"""
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps count once), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        best = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            best = min(best, value)
+        if best > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """Symmetric-delete word index with query postings"""
+
+    def __init__(self):
+        self.variants = {}  # deleted form -> words it came from
+        self.postings = {}  # word -> normalized queries containing it
+        self.display = {}  # normalized query -> most recent original spelling
+        self.uses = {}  # normalized query -> times used, for picking among many matches
+
+    @classmethod
+    def from_texts(cls, texts, uses=None):
+        """Build an index over an iterable of queries or names, with optional use counts"""
+        index = cls()
+        for text, count in zip(texts, uses or itertools.repeat(1)):
+            index.add(text, count)
+        return index
+
+    def add(self, text, uses=1):
+        """Index one query; repeated queries only refresh their spelling and count"""
+        key = normalize(text)
+        if not key:
+            return
+        self.uses[key] = self.uses.get(key, 0) + uses
+        if key not in self.display:
+            for word in set(key.split()):
+                keys = self.postings.get(word)
+                if keys is None:
+                    keys = self.postings[word] = set()
+                    for variant in _deletes(word, max_edits(word)):
+                        self.variants.setdefault(variant, set()).add(word)
+                keys.add(key)
+        self.display[key] = text.strip()
+
+    def similar_words(self, word):
+        """Indexed words within the typo budget of word: {word: distance}"""
+        limit = max_edits(word)
+        found = {}
+        for variant in _deletes(word, limit):
+            for candidate in self.variants.get(variant, ()):
+                if candidate not in found:
+                    distance = edit_distance(word, candidate, min(limit, max_edits(candidate)))
+                    if distance <= limit:
+                        found[candidate] = distance
+        return found
+
+    def matches(self, text, limit=None):
+        """Normalized queries close to text, best first, as (distance, key)"""
+        words = normalize(text).split()
+        if not words:
+            return []
+        per_word = [self.similar_words(word) for word in words]
+        if not all(per_word):
+            return []
+        # Intersect posting sets, smallest first
+        unions = [set().union(*(self.postings[w] for w in close)) for close in per_word]
+        order = sorted(range(len(words)), key=lambda i: len(unions[i]))
+        candidates = unions[order[0]]
+        for i in order[1:]:
+            candidates = candidates & unions[i]
+            if not candidates:
+                return []
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = self._pick(candidates, per_word[order[0]])
+        ranked = []
+        for key in candidates:
+            key_words = key.split()
+            distance = sum(min(close.get(w, 99) for w in key_words) for close in per_word)
+            # Prefer queries of about the typed length
+            ranked.append((distance, abs(len(key_words) - len(words)), key))
+        ranked.sort()
+        return [(distance, key) for distance, _, key in ranked[:limit]]
+
+    def _pick(self, candidates, close):
+        """MAX_CANDIDATES of candidates: through the closest words first, then most used"""
+        picked = []
+        for word in sorted(close, key=lambda w: (close[w], w)):
+            keys = self.postings[word] & candidates
+            candidates = candidates - keys
+            picked.extend(sorted(keys, key=lambda k: (-self.uses[k], k)))
+            if len(picked) >= MAX_CANDIDATES:
+                break
+        return picked[:MAX_CANDIDATES]
+
+    def did_you_mean(self, text, limit=5):
+        """Past spellings close to, but not the same as, text"""
+        key = normalize(text)
+        return [self.display[k] for _, k in self.matches(text, limit + 1) if k != key][:limit]
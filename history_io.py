@@ -0,0 +1,244 @@
+import csv
+import heapq
+import itertools
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+from history_store import dump_snapshot, encode_entry, iter_db_entries, iter_entries
+from timestamps import is_legacy
+
+# -- History import, export and merge --
+#   widget.py --export history.jsonl               stored history as JSON lines
+#   widget.py --import laptop.jsonl desktop.csv    merge files into the stored history
+#   widget.py --merge a.json b.db c.csv --out all.jsonl
+# Everything streams: entries are read a chunk or a row at a time and written
+# as they arrive, so memory does not grow with the history size.  Merging is a
+# single heapq.merge pass over inputs that are each oldest first; duplicates
+# (same timestamp, engine and query) therefore arrive within one run of equal
+# timestamps and are dropped by remembering only the entries of that run.
+# Formats go by extension: .jsonl and .csv, .db (read only), and anything else
+# is a history snapshot (search_history.json, plus its journals).  '-' reads or
+# writes JSON lines on stdin/stdout.
+
+CSV_HEADER = ("timestamp", "engine", "query")
+WRITE_BATCH = 4096  # Lines joined per write
+_decode = json.JSONDecoder().raw_decode
+_INF = float('inf')
+_CLOCK = re.compile(r"\s*\d{1,2}:\d{2}\s*$")  # Legacy "%H:%M" timestamp
+
+
+def _parse_time(value):
+    """Epoch seconds from a number, a numeric string or an ISO date and time"""
+    if not isinstance(value, str):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.strip()).timestamp()
+
+
+def iter_jsonl(f):
+    """Entries from JSON lines: [timestamp, engine, query] or objects with those keys"""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        record = _decode(line)[0]
+        if isinstance(record, dict):
+            record = (record['timestamp'], record['engine'], record['query'])
+        yield tuple(record)
+
+
+def iter_csv(f):
+    """Entries from CSV with a timestamp,engine,query header"""
+    rows = csv.reader(f)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [name.strip().lower() for name in header]
+    try:
+        order = [columns.index(name) for name in CSV_HEADER]
+    except ValueError:
+        raise ValueError(f"CSV header must name the columns {', '.join(CSV_HEADER)}")
+    for row in rows:
+        if row:
+            yield tuple(row[i] for i in order)
+
+
+def read_entries(path):
+    """Stream the (timestamp, engine, query) entries of a history file, in file order"""
+    if path == '-':
+        yield from iter_jsonl(sys.stdin)
+    elif path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from iter_jsonl(f)
+    elif path.endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from iter_csv(f)
+    elif path.endswith('.db'):
+        yield from iter_db_entries(path)
+    else:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No such file: {path}")
+        yield from iter_entries(path)
+
+
+def _batches(entries):
+    """Lists of up to WRITE_BATCH entries"""
+    entries = iter(entries)
+    return iter(lambda: list(itertools.islice(entries, WRITE_BATCH)), [])
+
+
+def _write_jsonl(entries, f):
+    count = 0
+    for batch in _batches(entries):
+        f.write(''.join(encode_entry(entry) + '\n' for entry in batch))
+        count += len(batch)
+    return count
+
+
+def _write_csv(entries, f):
+    writer = csv.writer(f)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for batch in _batches(entries):
+        writer.writerows(batch)
+        count += len(batch)
+    return count
+
+
+def write_entries(entries, path):
+    """Stream entries to a .jsonl, .csv or snapshot file (atomically replaced); return how many"""
+    if path == '-':
+        return _write_jsonl(entries, sys.stdout)
+    if path.endswith('.jsonl'):
+        write = _write_jsonl
+    elif path.endswith('.csv'):
+        write = _write_csv
+    elif path.endswith('.db'):
+        raise ValueError("cannot write .db files; choose .jsonl, .csv or .json")
+    else:
+        write = dump_snapshot
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='' if write is _write_csv else None) as f:
+            count = write(entries, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def new_stats():
+    """Counters filled in by merge_entries"""
+    return {'read': 0, 'written': 0, 'duplicates': 0, 'invalid': 0, 'legacy': 0, 'unordered': 0}
+
+
+def _timestamp(entry):
+    return entry[0]
+
+
+def _checked(entries, stats):
+    """Entries normalized to (float timestamp, engine, query), counting what is skipped"""
+    last = -_INF
+    for entry in entries:
+        stats['read'] += 1
+        try:
+            timestamp, engine, query = entry
+            if timestamp.__class__ is not float:
+                timestamp = _parse_time(timestamp)
+                entry = (timestamp, engine, query)
+            if engine.__class__ is not str or query.__class__ is not str:
+                entry = (timestamp, str(engine), str(query))
+        except (ValueError, TypeError):
+            # "%H:%M" rows from old versions have no date to merge by
+            legacy = bool(entry) and is_legacy(entry[0]) and _CLOCK.match(entry[0]) is not None
+            stats['legacy' if legacy else 'invalid'] += 1
+            continue
+        if not -_INF < timestamp < _INF:
+            stats['invalid'] += 1
+            continue
+        if timestamp < last:
+            stats['unordered'] += 1
+        last = timestamp
+        yield entry
+
+
+def merge_entries(sources, stats=None):
+    """One sorted pass over oldest-first entry streams, without duplicates
+
+    Entries with the same timestamp (a fan-out) keep their source order, which
+    is not sorted by engine, so duplicates are found by remembering the
+    (engine, query) pairs seen at the current timestamp.  Sources that are not
+    in time order still lose nothing, but the output is then only as ordered
+    as they are (counted in stats['unordered']).
+    """
+    stats = new_stats() if stats is None else stats
+    current, seen = None, set()
+    for entry in heapq.merge(*(_checked(source, stats) for source in sources),
+                             key=_timestamp):
+        if entry[0] != current:
+            current = entry[0]
+            seen.clear()
+        elif entry in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(entry)
+        stats['written'] += 1
+        yield entry
+
+
+def _report(stats, action, err):
+    """One summary line, plus a warning for anything skipped"""
+    print(f"{action} {stats['written']} entries ({stats['read']} read, "
+          f"{stats['duplicates']} duplicates dropped)", file=err)
+    if stats['invalid']:
+        print(f"skipped {stats['invalid']} unreadable entries", file=err)
+    if stats['legacy']:
+        print(f"skipped {stats['legacy']} entries with time-of-day-only timestamps "
+              "(start the widget once on that history to convert them)", file=err)
+    if stats['unordered']:
+        print(f"warning: {stats['unordered']} entries were older than the entry before them;"
+              " the output is not fully sorted", file=err)
+
+
+def main(args, err=None):
+    """Entry point for --export, --import and --merge; returns the process exit code"""
+    err = err or sys.stderr
+    stats = new_stats()
+    try:
+        if args.merge:
+            if not args.out:
+                print("--merge needs --out FILE", file=err)
+                return 2
+            write_entries(merge_entries([read_entries(p) for p in args.merge], stats), args.out)
+            _report(stats, "merged", err)
+            return 0
+        import instance
+        if args.import_files and instance.running():
+            print("Close the running widget before importing history", file=err)
+            return 2
+        import search_core
+        if args.export:
+            write_entries(merge_entries([search_core.iter_stored_history()], stats), args.export)
+            _report(stats, "exported", err)
+        else:
+            sources = [search_core.iter_stored_history()]
+            sources += [read_entries(p) for p in args.import_files]
+            dropped = search_core.replace_stored_history(merge_entries(sources, stats))
+            stats['written'] -= dropped
+            _report(stats, "stored", err)
+            if dropped:
+                print(f"dropped the {dropped} oldest entries: the history keeps the newest"
+                      f" {search_core.history.capacity} (raise max_history to keep more)", file=err)
+    except Exception as e:
+        print(f"Failed: {e}", file=err)
+        return 2
+    return 0
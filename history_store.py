@@ -0,0 +1,642 @@
+import collections
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+from history_buffer import HistoryBuffer
+from persistence import PersistenceWriter
+from timestamps import is_legacy, migrate_entries
+
+# -- Journaled history store --
+# The snapshot file holds the compacted history.  Searches made since the last
+# compaction are appended, one compact JSON record per line, to journal files
+# named "<snapshot>.<generation>.journal".  A snapshot remembers the newest
+# generation it has absorbed, so a crash between writing the snapshot and
+# deleting old journals never replays entries twice.  Snapshots are written
+# by the shared PersistenceWriter (atomic replace, coalesced saves).  Files
+# from versions that stored "%H:%M" times are migrated to epoch seconds on
+# load and compacted right away.
+
+COMPACT_THRESHOLD = 500  # Minimum journal records before a background compaction
+STREAM_CHUNK = 1 << 16  # Characters read at a time when streaming a snapshot
+_SEPARATORS = re.compile(r"[\s,]*")
+_SNAPSHOT_HEADER = re.compile(r'"generation"\s*:\s*(\d+)|"entries"\s*:\s*\[')
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+_quote = json.encoder.encode_basestring  # JSON string literal, non-ASCII kept as is
+WRITE_BATCH = 4096  # Records joined per write when streaming a snapshot
+
+
+def encode_entry(entry):
+    """A (timestamp, engine, query) entry as a compact JSON array
+
+    Formats the three fields directly, which is several times faster than
+    the generic encoder for the millions of records of an export.
+    """
+    timestamp, engine, query = entry
+    timestamp = repr(timestamp) if timestamp.__class__ is float else _encode(timestamp)
+    return f'[{timestamp},{_quote(engine)},{_quote(query)}]'
+
+
+def dump_snapshot(entries, f, generation=0):
+    """Write entries to f as a snapshot, a batch of records at a time; return how many"""
+    f.write(f'{{"generation":{generation},"entries":[')
+    entries = iter(entries)
+    count = 0
+    for batch in iter(lambda: list(itertools.islice(entries, WRITE_BATCH)), []):
+        f.write((',' if count else '') + ','.join(map(encode_entry, batch)))
+        count += len(batch)
+    f.write(']}')
+    return count
+
+
+def _stream_array(f, buffer, strict=False):
+    """Yield the items of a JSON array whose '[' has been consumed, reading as needed
+
+    A truncated or garbled array ends the items, or raises ValueError if strict.
+    """
+    decoder = json.JSONDecoder()
+    pos = 0
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if buffer.startswith(']', pos):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            more = f.read(STREAM_CHUNK)
+            if not more:
+                if strict:
+                    raise ValueError(f"unreadable entry: {e}") from None
+                return  # Truncated file: keep what was readable
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+        yield item
+        pos = end
+
+
+def _snapshot_items(f, strict=False):
+    """The entry stream of an open snapshot and the journal generation it absorbed"""
+    buffer = f.read(STREAM_CHUNK)
+    start = _SEPARATORS.match(buffer).end()
+    if buffer.startswith('[', start):
+        return _stream_array(f, buffer[start + 1:], strict), 0  # Legacy plain list
+    absorbed = 0
+    for match in _SNAPSHOT_HEADER.finditer(buffer):
+        if match.group(1) is not None:
+            absorbed = int(match.group(1))
+        else:
+            return _stream_array(f, buffer[match.end():], strict), absorbed
+    if strict and not buffer.startswith('{', start):
+        raise ValueError("not a history snapshot")
+    return (), absorbed
+
+
+def _newest(entries, capacity):
+    """The last `capacity` entries of a stream and how many older ones were left out"""
+    if capacity is None:
+        return entries, 0
+    newest = collections.deque(maxlen=capacity)
+    total = 0
+    for entry in entries:
+        newest.append(entry)
+        total += 1
+    return newest, total - len(newest)
+
+
+def iter_entries(snapshot_path):
+    """Stream (timestamp, engine, query) entries of a journaled history, oldest first
+
+    Reads the snapshot a chunk at a time, then the journals it has not
+    absorbed, so memory stays constant whatever the history size.  Unlike
+    JournaledHistory.load, nothing is capped, migrated or repaired.
+    """
+    absorbed = 0
+    try:
+        f = open(snapshot_path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        f = None
+    if f is not None:
+        with f:
+            items, absorbed = _snapshot_items(f)
+            for item in items:
+                yield tuple(item)
+    for generation in journal_generations(snapshot_path):
+        if generation > absorbed:
+            yield from iter_journal(f"{snapshot_path}.{generation}.journal")
+
+
+def journal_generations(snapshot_path):
+    """Generations of the "<snapshot>.<generation>.journal" files on disk, oldest first"""
+    folder, base = os.path.split(snapshot_path)
+    prefix, suffix = base + '.', '.journal'
+    generations = []
+    try:
+        names = os.listdir(folder or '.')
+    except OSError:
+        return generations
+    for name in names:
+        if name.startswith(prefix) and name.endswith(suffix):
+            middle = name[len(prefix):-len(suffix)]
+            if middle.isdigit():
+                generations.append(int(middle))
+    return sorted(generations)
+
+
+def iter_journal(path):
+    """Records of a journal file, stopping at a torn or unreadable last line"""
+    try:
+        with open(path, 'r', encoding='utf-8') as journal:
+            for line in journal:
+                if not line.endswith('\n'):
+                    return
+                yield tuple(json.loads(line))
+    except (OSError, ValueError):
+        return
+
+
+class JournaledHistory:
+    """Append-only history store with background snapshot compaction"""
+
+    def __init__(self, snapshot_path, compact_threshold=COMPACT_THRESHOLD, capacity=None,
+                 writer=None):
+        self.snapshot_path = snapshot_path
+        self.compact_threshold = compact_threshold
+        self.entries = HistoryBuffer(capacity)
+        self.generation = 0
+        self.journal_records = 0
+        self.load_errors = []
+        self._journal = None
+        self._lock = threading.Lock()
+        self._writer = writer
+
+    @property
+    def writer(self):
+        """Writer used for snapshots (created on first compaction if not given)"""
+        if self._writer is None:
+            self._writer = PersistenceWriter()
+        return self._writer
+
+    def journal_path(self, generation):
+        """Path of the journal file for a generation"""
+        return f"{self.snapshot_path}.{generation}.journal"
+
+    def _journal_generations(self):
+        """Generations of all journal files on disk, oldest first"""
+        return journal_generations(self.snapshot_path)
+
+    # -- Loading --
+    def load(self):
+        """Replay snapshot plus journals and return the history list"""
+        # Only the newest entries are kept as the snapshot streams in, so a
+        # large snapshot never has to fit in memory
+        entries = collections.deque(maxlen=self.entries.capacity)
+        absorbed = self._read_snapshot(entries)
+        self.generation = absorbed
+        self.journal_records = 0
+        newest = self._mtime(self.snapshot_path)
+        for generation in self._journal_generations():
+            path = self.journal_path(generation)
+            if generation <= absorbed:
+                self._remove(path)
+                continue
+            records = self._read_journal(path)
+            entries.extend(records)
+            self.generation = generation
+            self.journal_records += len(records)
+            newest = max(newest, self._mtime(path))
+
+        legacy = any(is_legacy(e[0]) for e in entries)
+        if legacy:
+            entries = migrate_entries(entries, newest)
+        self.entries.clear()
+        self.entries.extend(entries)
+        if self.generation == absorbed:
+            self.generation += 1
+        if legacy:
+            # Wait, so anything streaming the stored history sees epoch times
+            self.compact(wait=True)
+        return self.entries
+
+    @staticmethod
+    def _mtime(path):
+        """Modification time of a file, or 0 if it does not exist"""
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
+    def _read_snapshot(self, entries):
+        """Stream the compacted snapshot into entries; return the generation it absorbed
+
+        Accepts the legacy plain list format.
+        """
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                items, absorbed = _snapshot_items(f, strict=True)
+                entries.extend(tuple(e) for e in items)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, TypeError) as e:
+            # Keep the unreadable file for inspection instead of overwriting it
+            entries.clear()
+            self.load_errors.append(f"{self.snapshot_path}: {e}")
+            try:
+                os.replace(self.snapshot_path, self.snapshot_path + '.corrupt')
+            except OSError:
+                pass
+            return 0
+        return absorbed
+
+    def _read_journal(self, path):
+        """Read a journal, truncating a torn last record left by a crash"""
+        records = []
+        good_offset = 0
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return records
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records.append(tuple(json.loads(line)))
+            except ValueError:
+                break
+            good_offset += len(line)
+        if good_offset != len(data):
+            try:
+                with open(path, 'r+b') as f:
+                    f.truncate(good_offset)
+            except OSError:
+                pass
+        return records
+
+    @staticmethod
+    def _remove(path):
+        """Delete a file, ignoring files that are already gone"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # -- Writing --
+    def append(self, entry):
+        """Append one entry to memory and the journal in constant time"""
+        self.append_many((entry,))
+
+    def append_many(self, entries):
+        """Append entries with a single journal write"""
+        entries = list(entries)
+        self.entries.extend(entries)
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path(self.generation), 'a', encoding='utf-8')
+            self._journal.write(''.join(encode_entry(entry) + '\n' for entry in entries))
+            self._journal.flush()
+            self.journal_records += len(entries)
+            # Scale the threshold with history size so compaction stays O(1) amortized
+            due = self.journal_records >= max(self.compact_threshold, len(self.entries))
+        if due:
+            self.compact()
+
+    def rewrite(self, entries):
+        """Replace the whole history (e.g. after clearing it)"""
+        if entries is not self.entries:
+            entries = list(entries)
+            self.entries.clear()
+            self.entries.extend(entries)
+        self.compact()
+
+    def compact(self, wait=False):
+        """Start a new journal and hand a snapshot of the history to the writer"""
+        with self._lock:
+            absorbed = self.generation
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            self.generation = absorbed + 1
+            self.journal_records = 0
+            snapshot = list(self.entries)
+        self.writer.schedule(
+            self.snapshot_path,
+            lambda: json.dumps({'generation': absorbed, 'entries': snapshot},
+                               ensure_ascii=False, separators=(',', ':')),
+            on_written=lambda: self._drop_journals(absorbed)
+        )
+        if wait:
+            self.writer.flush()
+
+    def replace_all(self, entries):
+        """Replace the stored history with a stream of entries, oldest first
+
+        Only the newest `capacity` entries are kept, since every later
+        compaction rewrites the snapshot from the capped buffer anyway; returns
+        how many older ones were dropped.  The snapshot is written directly
+        (not through the writer) so an uncapped history never needs to be in
+        memory at once.
+        """
+        entries, dropped = _newest(entries, self.entries.capacity)
+        if self._writer:
+            self._writer.flush()  # A pending compaction must not land afterwards
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            absorbed = max([self.generation, *self._journal_generations()])
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    dump_snapshot(entries, f, absorbed)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.snapshot_path)
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+            self.generation = absorbed + 1
+            self.journal_records = 0
+        self._drop_journals(absorbed)
+        self.entries.clear()
+        self.entries.extend(iter_entries(self.snapshot_path))
+        return dropped
+
+    def _drop_journals(self, absorbed):
+        """Delete journals whose records are now in the snapshot"""
+        for generation in self._journal_generations():
+            if generation <= absorbed:
+                self._remove(self.journal_path(generation))
+
+    # -- Queries --
+    def between(self, start=None, end=None, limit=100):
+        """Most recent entries with start <= timestamp < end (day-indexed)"""
+        return self.entries.between(start, end)[:limit]
+
+    def search_text(self, text, limit=100):
+        """Most recent entries whose query contains text"""
+        needle = text.lower()
+        return self._scan(lambda e: needle in e[2].lower(), limit)
+
+    def by_engine(self, engine, limit=100):
+        """Most recent entries made on an engine"""
+        return self._scan(lambda e: e[1] == engine, limit)
+
+    def search_prefix(self, prefix, limit=100):
+        """Most recent entries whose query starts with prefix"""
+        return self._scan(lambda e: e[2].startswith(prefix), limit)
+
+    def recent(self, limit=100):
+        """Most recent entries, newest first"""
+        return list(itertools.islice(reversed(self.entries), limit))
+
+    def _scan(self, predicate, limit):
+        """Newest-first linear scan of the in-memory entries"""
+        found = []
+        for entry in reversed(self.entries):
+            if predicate(entry):
+                found.append(entry)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def iter_all(self):
+        """Stream the full stored history, oldest first"""
+        return iter_entries(self.snapshot_path)
+
+    def close(self):
+        """Wait for pending snapshot writes and close the journal"""
+        if self._writer:
+            self._writer.flush()
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+
+# -- Indexed SQLite history store --
+# Keeps the full history on disk and only the most recent entries in memory.
+# Full-text lookups use an FTS5 table (trigram tokenized where the bundled
+# SQLite supports it) and fall back to LIKE scans when FTS5 is unavailable.
+# Timestamps are REAL epoch seconds with their own index for date ranges;
+# databases from before that stored "%H:%M" text and are rebuilt once.
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    engine TEXT NOT NULL,
+    query TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_engine ON history(engine, id);
+CREATE INDEX IF NOT EXISTS history_time ON history(timestamp);
+CREATE INDEX IF NOT EXISTS history_query ON history(query);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    query, content='history', content_rowid='id', tokenize='{tokenizer}'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, query) VALUES (new.id, new.query);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, query) VALUES ('delete', old.id, old.query);
+END;
+"""
+
+
+def iter_db_entries(db_path):
+    """Stream the entries of a history database read-only, oldest first"""
+    import sqlite3
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        for row in db.execute("SELECT timestamp, engine, query FROM history ORDER BY id"):
+            yield tuple(row)
+    finally:
+        db.close()
+
+
+class SQLiteHistory:
+    """Indexed on-disk history store with full-text and prefix search"""
+
+    def __init__(self, db_path, legacy_path=None, capacity=100):
+        self.db_path = db_path
+        self.legacy_path = legacy_path
+        self.entries = HistoryBuffer(capacity)
+        self.fts = False
+        self._lock = threading.Lock()
+        import sqlite3  # Only loaded when the SQLite backend is selected
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SQLITE_SCHEMA)
+        self._create_fts()
+        if self._meta('timestamps') != 'epoch':
+            self._upgrade_timestamps()
+
+    def _create_fts(self):
+        """Create the FTS5 index, preferring the trigram tokenizer for substrings"""
+        import sqlite3
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                self._db.executescript(FTS_SCHEMA.format(tokenizer=tokenizer))
+            except sqlite3.OperationalError:
+                continue
+            self.fts = tokenizer
+            return
+
+    def _meta(self, key):
+        """Read a value from the meta table"""
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _upgrade_timestamps(self):
+        """Rebuild a database with "%H:%M" text timestamps as REAL epoch seconds"""
+        rows = self._db.execute("SELECT id, timestamp, engine, query FROM history ORDER BY id").fetchall()
+        try:
+            reference = os.path.getmtime(self.db_path)
+        except OSError:
+            reference = time.time()
+        migrated = migrate_entries([(ts, row_id, engine, query) for row_id, ts, engine, query in rows],
+                                   reference)
+        # Fill a new table first, then swap it in
+        with self._lock, self._db:
+            self._db.execute("DROP TABLE IF EXISTS history_upgrade")
+            self._db.execute(
+                "CREATE TABLE history_upgrade (id INTEGER PRIMARY KEY, timestamp REAL NOT NULL,"
+                " engine TEXT NOT NULL, query TEXT NOT NULL)")
+            self._db.executemany(
+                "INSERT INTO history_upgrade VALUES (?, ?, ?, ?)",
+                ((row_id, float(ts), engine, query) for ts, row_id, engine, query in migrated))
+        self._swap_in("history_upgrade")
+
+    def _swap_in(self, table):
+        """Replace the history table with a filled staging table and reindex
+
+        Runs as one script transaction, so an interruption leaves the old
+        table intact.
+        """
+        with self._lock:
+            self._db.executescript(
+                f"BEGIN; DROP TABLE history; ALTER TABLE {table} RENAME TO history;"
+                + SQLITE_SCHEMA
+                + (FTS_SCHEMA.format(tokenizer=self.fts) if self.fts else "")
+                + ("INSERT INTO history_fts(history_fts) VALUES ('rebuild');" if self.fts else "")
+                + "INSERT OR REPLACE INTO meta VALUES ('timestamps', 'epoch'); COMMIT;")
+
+    # -- Loading --
+    def load(self):
+        """Migrate legacy JSON history once, then load the most recent entries"""
+        if self.legacy_path and not self._meta('migrated'):
+            self._migrate(self.legacy_path)
+        self.entries.clear()
+        self.entries.extend(self.recent(self.entries.capacity or -1)[::-1])
+        return self.entries
+
+    def _migrate(self, legacy_path):
+        """Import an existing search_history.json (plus journals) into the database"""
+        legacy = JournaledHistory(legacy_path).load()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO history(timestamp, engine, query) VALUES (?, ?, ?)",
+                (tuple(e) for e in legacy))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', ?)", (legacy_path,))
+
+    # -- Writing --
+    def append(self, entry):
+        """Insert one entry; the indexes are maintained by SQLite"""
+        self.append_many((entry,))
+
+    def append_many(self, entries):
+        """Insert entries in one transaction"""
+        entries = [tuple(e) for e in entries]
+        self.entries.extend(entries)
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO history(timestamp, engine, query) VALUES (?, ?, ?)", entries)
+
+    def rewrite(self, entries):
+        """Replace the whole history (e.g. after clearing it)"""
+        if entries is not self.entries:
+            entries = list(entries)
+            self.entries.clear()
+            self.entries.extend(entries)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM history")
+            if self.fts:
+                self._db.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+            self._db.executemany(
+                "INSERT INTO history(timestamp, engine, query) VALUES (?, ?, ?)",
+                (tuple(e) for e in self.entries))
+
+    def replace_all(self, entries):
+        """Replace the stored history with a stream of entries, oldest first
+
+        Keeps the newest `capacity` entries, like the JSON store; returns how
+        many older ones were dropped.
+        """
+        entries, dropped = _newest(entries, self.entries.capacity)
+        with self._lock, self._db:
+            self._db.execute("DROP TABLE IF EXISTS history_import")
+            self._db.execute(
+                "CREATE TABLE history_import (id INTEGER PRIMARY KEY, timestamp REAL NOT NULL,"
+                " engine TEXT NOT NULL, query TEXT NOT NULL)")
+            self._db.executemany(
+                "INSERT INTO history_import(timestamp, engine, query) VALUES (?, ?, ?)",
+                (tuple(e) for e in entries))
+        self._swap_in("history_import")
+        self.entries.clear()
+        self.entries.extend(self.recent(self.entries.capacity or -1)[::-1])
+        return dropped
+
+    # -- Queries --
+    def _select(self, where, params, limit):
+        """Run a newest-first history query"""
+        sql = f"SELECT timestamp, engine, query FROM history {where} ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            return [tuple(r) for r in self._db.execute(sql, (*params, limit))]
+
+    def search_text(self, text, limit=100):
+        """Most recent entries whose query contains text"""
+        if (self.fts == 'trigram' and len(text) >= 3) or (self.fts == 'unicode61' and text.strip()):
+            phrase = '"' + text.replace('"', '""') + '"'
+            return self._select(
+                "WHERE id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)",
+                (phrase,), limit)
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return self._select("WHERE query LIKE ? ESCAPE '\\'", (f"%{escaped}%",), limit)
+
+    def search_prefix(self, prefix, limit=100):
+        """Most recent entries whose query starts with prefix (uses the query index)"""
+        if not prefix:
+            return self.recent(limit)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return self._select("WHERE query >= ? AND query < ?", (prefix, upper), limit)
+
+    def between(self, start=None, end=None, limit=100):
+        """Most recent entries with start <= timestamp < end (uses the time index)"""
+        return self._select("WHERE timestamp >= ? AND timestamp < ?",
+                            (float('-inf') if start is None else start,
+                             float('inf') if end is None else end), limit)
+
+    def by_engine(self, engine, limit=100):
+        """Most recent entries made on an engine"""
+        return self._select("WHERE engine = ?", (engine,), limit)
+
+    def recent(self, limit=100):
+        """Most recent entries, newest first"""
+        return self._select("", (), limit)
+
+    def iter_all(self):
+        """Stream every stored entry, oldest first, over a separate read connection"""
+        return iter_db_entries(self.db_path)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._db.close()
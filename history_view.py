@@ -0,0 +1,139 @@
+import tkinter as tk
+
+from timestamps import format_timestamp
+
+# -- Virtualized list --
+# Only as many row labels as fit in the window exist; scrolling just changes
+# which slice of the data source they display.  Rows are fetched and formatted
+# on demand, so memory and open time do not depend on the number of rows.
+
+
+def format_entry(entry):
+    """Display string for one (timestamp, engine, query) entry"""
+    return f"[{format_timestamp(entry[0])}] {entry[1]}: {entry[2]}"
+
+
+def format_history_rows(history, start, stop):
+    """Display strings for history rows start..stop, newest first"""
+    last = len(history) - 1
+    return [format_entry(history[last - i]) for i in range(start, stop)]
+
+
+class VirtualList(tk.Frame):
+    """Scrollable list that renders only the visible rows"""
+
+    def __init__(self, master, size, fetch, on_activate=None, row_height=22,
+                 font=None, bg=None, fg=None, select_bg=None, **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.size = size  # () -> number of rows
+        self.fetch = fetch  # (start, stop) -> display strings for those rows
+        self.on_activate = on_activate  # (index) -> None, on double-click/Return
+        self.row_height = row_height
+        self.style = {'font': font, 'bg': bg, 'fg': fg, 'select_bg': select_bg}
+        self.top = 0
+        self.selected = None
+        self.labels = []
+
+        self.body = tk.Frame(self, bg=bg)
+        self.body.pack(side="left", fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.body.bind("<Configure>", self._on_resize)
+        for widget in (self, self.body):
+            widget.bind("<MouseWheel>", self._on_wheel)
+            widget.bind("<Button-4>", lambda e: self.scroll(-3))
+            widget.bind("<Button-5>", lambda e: self.scroll(3))
+        self.bind("<Up>", lambda e: self.move_selection(-1))
+        self.bind("<Down>", lambda e: self.move_selection(1))
+        self.bind("<Prior>", lambda e: self.scroll(-len(self.labels)))
+        self.bind("<Next>", lambda e: self.scroll(len(self.labels)))
+        self.bind("<Return>", lambda e: self.activate(self.selected))
+
+    # -- Rows --
+    def _on_resize(self, event):
+        """Create or destroy row labels so exactly the visible rows exist"""
+        wanted = max(1, event.height // self.row_height)
+        while len(self.labels) < wanted:
+            row = len(self.labels)
+            label = tk.Label(self.body, anchor="w", font=self.style['font'],
+                             bg=self.style['bg'], fg=self.style['fg'])
+            label.place(x=0, y=row * self.row_height, relwidth=1, height=self.row_height)
+            label.bind("<Button-1>", lambda e, r=row: self.select(self.top + r))
+            label.bind("<Double-Button-1>", lambda e, r=row: self.activate(self.top + r))
+            label.bind("<MouseWheel>", self._on_wheel)
+            label.bind("<Button-4>", lambda e: self.scroll(-3))
+            label.bind("<Button-5>", lambda e: self.scroll(3))
+            self.labels.append(label)
+        while len(self.labels) > wanted:
+            self.labels.pop().destroy()
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the visible rows from the data source"""
+        total = self.size()
+        visible = len(self.labels)
+        self.top = max(0, min(self.top, total - visible))
+        texts = self.fetch(self.top, min(total, self.top + visible)) if total else []
+        for row, label in enumerate(self.labels):
+            index = self.top + row
+            label.config(
+                text=texts[row] if row < len(texts) else "",
+                bg=self.style['select_bg'] if index == self.selected else self.style['bg']
+            )
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def reset(self):
+        """Scroll back to the first row and clear the selection"""
+        self.top = 0
+        self.selected = None
+        self.refresh()
+
+    # -- Scrolling --
+    def yview(self, *args):
+        """Scrollbar callback ('moveto', fraction) or ('scroll', n, units|pages)"""
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self.size())
+        elif args[0] == "scroll":
+            step = int(args[1]) * (len(self.labels) if args[2] == "pages" else 1)
+            self.top += step
+        self.refresh()
+
+    def scroll(self, rows):
+        """Scroll by a number of rows"""
+        self.top += rows
+        self.refresh()
+        return "break"
+
+    def _on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    # -- Selection --
+    def select(self, index):
+        """Highlight a row and take keyboard focus"""
+        if 0 <= index < self.size():
+            self.selected = index
+        self.focus_set()
+        self.refresh()
+
+    def move_selection(self, step):
+        """Move the highlight, scrolling it into view"""
+        total = self.size()
+        if not total:
+            return "break"
+        index = 0 if self.selected is None else max(0, min(total - 1, self.selected + step))
+        self.selected = index
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + len(self.labels):
+            self.top = index - len(self.labels) + 1
+        self.refresh()
+        return "break"
+
+    def activate(self, index):
+        """Run the activation callback for a row"""
+        if self.on_activate and index is not None and 0 <= index < self.size():
+            self.on_activate(index)
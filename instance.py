@@ -0,0 +1,173 @@
+import argparse
+import atexit
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+
+# -- Single instance --
+# The first widget owns a localhost socket on a fixed port; binding it is the
+# single-instance lock.  Its port and a random token go to instance.json in a
+# per-user folder that every launch agrees on (see instance_dir).  Later
+# launches read that file, send one JSON line such as
+#   {"token": "...", "action": "search", "query": "foo", "engine": "14"}
+# and exit as soon as the owner answers "ok".  A launch that loses the port to
+# one started at the same moment forwards to it once it is listening instead
+# of running unlocked.  This module only uses the standard library so the
+# forwarding path never pays for Tk or history loading.
+#   widget.py --query "foo" --engine 14   search from a script or shortcut
+#   widget.py                             show the running widget
+
+
+def instance_dir():
+    """Folder for instance.json: the same for every launch by this user
+
+    A onefile build unpacks to a fresh _MEI temp folder on each launch, so the
+    module's own folder only works when running from source.
+    """
+    if os.environ.get("SEARCH_WIDGET_HOME"):
+        return os.environ["SEARCH_WIDGET_HOME"]
+    if os.environ.get("LOCALAPPDATA"):
+        return os.path.join(os.environ["LOCALAPPDATA"], "SearchWidget")
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(os.path.abspath(sys.executable))
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+INSTANCE_FILE = os.path.join(instance_dir(), "instance.json")
+HOST = "127.0.0.1"
+DEFAULT_PORT = 47653
+CONNECT_TIMEOUT = 0.5  # Seconds to wait for the running widget
+MAX_REQUEST = 64 * 1024  # Bytes accepted per request
+FORWARD_RETRIES = 25  # Attempts to reach a widget that won the race for the port
+RETRY_DELAY = 0.2  # Seconds between those attempts
+# Command line modes that never forward
+HEADLESS_OPTIONS = ("--batch", "--stats", "--stats-file", "--export", "--import", "--merge")
+
+
+def add_arguments(parser):
+    """Register the options a second launch forwards to the running widget"""
+    parser.add_argument("--query", help="search QUERY (in the running widget if there is one)")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="start a separate widget instead of forwarding to a running one")
+
+
+def request_from_args(args):
+    """The message a launch with these options sends"""
+    if args.query:
+        return {'action': 'search', 'query': args.query, 'engine': args.engine}
+    return {'action': 'show'}
+
+
+def forward(argv):
+    """Send this launch's request to the running widget; True if it took it"""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_arguments(parser)
+    parser.add_argument("--engine")
+    args, _ = parser.parse_known_args(argv)
+    if args.new_instance or "-h" in argv or "--help" in argv or any(
+            arg.split("=", 1)[0] in HEADLESS_OPTIONS for arg in argv):
+        return False
+    try:
+        with open(INSTANCE_FILE, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        message = dict(request_from_args(args), token=info['token'])
+        with socket.create_connection((HOST, info['port']), timeout=CONNECT_TIMEOUT) as conn:
+            conn.sendall(json.dumps(message).encode('utf-8') + b"\n")
+            return conn.makefile('rb').readline().strip() == b"ok"
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+
+def forward_when_ready(argv, retries=FORWARD_RETRIES, delay=RETRY_DELAY):
+    """Forward to a widget that has just bound the port, once it is listening"""
+    for _ in range(retries):
+        time.sleep(delay)
+        if forward(argv):
+            return True
+    return False
+
+
+def running():
+    """Whether a widget instance is currently listening"""
+    try:
+        with open(INSTANCE_FILE, 'r', encoding='utf-8') as f:
+            port = json.load(f)['port']
+        socket.create_connection((HOST, port), timeout=CONNECT_TIMEOUT).close()
+        return True
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+
+class InstanceServer:
+    """Accepts forwarded requests and hands them to on_request (on its own thread)"""
+
+    def __init__(self, on_request, port=DEFAULT_PORT):
+        self.on_request = on_request
+        self.token = secrets.token_hex(16)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):  # Windows: no port sharing
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        try:
+            self.sock.bind((HOST, port))
+            self.sock.listen(8)
+        except OSError:
+            self.sock.close()
+            raise
+        self.port = self.sock.getsockname()[1]
+        self._closed = False
+        try:
+            os.makedirs(os.path.dirname(INSTANCE_FILE), exist_ok=True)
+            with open(INSTANCE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'port': self.port, 'token': self.token, 'pid': os.getpid()}, f)
+        except OSError:
+            self.sock.close()  # Later launches could not find us: give up the lock
+            raise
+        threading.Thread(target=self._serve, daemon=True).start()
+        atexit.register(self.close)
+
+    @classmethod
+    def start(cls, on_request, port=DEFAULT_PORT):
+        """Become the primary instance, or return None if another one owns the port"""
+        try:
+            return cls(on_request, port)
+        except OSError:
+            return None
+
+    def _serve(self):
+        """Accept loop; each request is one JSON line answered with ok or error"""
+        while not self._closed:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(CONNECT_TIMEOUT)
+                    line = conn.makefile('rb').readline(MAX_REQUEST)
+                    message = json.loads(line)
+                    if not secrets.compare_digest(str(message.pop('token', '')), self.token):
+                        raise ValueError("bad token")
+                    self.on_request(message)
+                    conn.sendall(b"ok\n")
+                except (OSError, ValueError, AttributeError, TypeError):
+                    try:
+                        conn.sendall(b"error\n")
+                    except OSError:
+                        pass
+
+    def close(self):
+        """Stop listening and remove instance.json if it is still ours"""
+        if self._closed:
+            return
+        self._closed = True
+        self.sock.close()
+        try:
+            with open(INSTANCE_FILE, 'r', encoding='utf-8') as f:
+                if json.load(f).get('pid') == os.getpid():
+                    os.remove(INSTANCE_FILE)
+        except (OSError, ValueError):
+            pass
@@ -0,0 +1,362 @@
+import collections
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from urllib.parse import quote
+
+# -- Browser launching --
+# Searches go through a launcher backend chosen by the 'launcher' setting:
+#   webbrowser  the webbrowser module for one URL; several URLs (fan-out
+#               searches) go to one process of the user's default browser as
+#               tabs of one window when that browser takes several URLs
+#               (the default)
+#   devtools    open tabs through a running Chromium's DevTools endpoint,
+#               falling back to webbrowser while it is not answering
+#   fake        count and remember URLs without opening anything
+# The DevTools backend keeps one HTTP connection to the browser open and asks
+# it for each new tab, so no process is spawned per search.  It needs the
+# browser started with --remote-debugging-port=9222 (the 'devtools_port'
+# setting; recent Chrome also wants a separate --user-data-dir).  It is opt-in
+# because every search URL is sent to whatever local process answers
+# /json/version on that port, and any local program can listen there.
+# search_core only hands the settings to configure_launcher(); the backend is
+# created on the first search, on the dispatch thread, so importing this
+# module costs nothing at startup.  While falling back, the endpoint is
+# rechecked on a background thread at most every PROBE_INTERVAL.
+# fake_browser.py stands in for a real browser in tests and benchmarks.
+
+# Browsers known to open every URL given on their command line as tabs
+MULTI_URL_BROWSERS = frozenset((
+    "chrome", "google-chrome", "google-chrome-stable", "chromium", "chromium-browser",
+    "msedge", "microsoft-edge", "microsoft-edge-stable", "brave", "brave-browser",
+    "vivaldi", "vivaldi-stable", "opera", "firefox",
+))
+URL_CHOICE_KEY = r"Software\Microsoft\Windows\Shell\Associations\UrlAssociations\https\UserChoice"
+LAUNCHERS = ("webbrowser", "devtools", "fake")
+HOST = "127.0.0.1"
+DEVTOOLS_PORT = 9222
+PROBE_INTERVAL = 30.0  # Seconds between checks for the DevTools endpoint while it is down
+PROBE_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 2.0
+FAKE_KEEP = 1000  # URLs the fake backend remembers
+
+_browser = None
+
+
+def _windows_default_browser():
+    """Executable registered for https links in the user's default apps"""
+    import winreg
+    with winreg.OpenKey(winreg.HKEY_CURRENT_USER, URL_CHOICE_KEY) as key:
+        prog_id = winreg.QueryValueEx(key, "ProgId")[0]
+    with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, rf"{prog_id}\shell\open\command") as key:
+        command = winreg.QueryValueEx(key, "")[0].strip()
+    # '"C:\...\chrome.exe" --single-argument %1': only the executable
+    if command.startswith('"'):
+        return command[1:].split('"', 1)[0]
+    return command.split()[0] if command else None
+
+
+def _xdg_default_browser():
+    """Command of the desktop's default browser, from xdg-settings"""
+    result = subprocess.run(["xdg-settings", "get", "default-web-browser"],
+                            capture_output=True, text=True, timeout=2)
+    desktop = result.stdout.strip()  # Such as "firefox.desktop"
+    return shutil.which(desktop[:-len(".desktop")]) if desktop.endswith(".desktop") else None
+
+
+def default_browser():
+    """Executable of the user's default browser, or None if it cannot be told"""
+    try:
+        if os.name == 'nt':
+            return _windows_default_browser()
+        if shutil.which("xdg-settings"):
+            return _xdg_default_browser()
+    except (OSError, ValueError, subprocess.SubprocessError):
+        pass
+    return None
+
+
+def find_browser():
+    """The default browser's path if it accepts several URLs in one invocation, or None
+
+    Any other default browser (or one that cannot be found) is left to the
+    webbrowser module, so fan-outs never open in a browser the user did not pick.
+    """
+    global _browser
+    if _browser is None:
+        path = default_browser()
+        name = os.path.splitext(os.path.basename(path))[0].lower() if path else ""
+        _browser = path if name in MULTI_URL_BROWSERS else ""
+    return _browser or None
+
+
+class WebbrowserLauncher:
+    """The webbrowser module, or one browser process for several URLs"""
+
+    name = "webbrowser"
+
+    def __init__(self, command=None):
+        self.command = command  # Browser argv used for every launch instead of webbrowser
+
+    def open(self, url):
+        """Open one URL"""
+        if self.command:
+            self._spawn(self.command, [url])
+            return
+        import webbrowser
+        webbrowser.open(url)
+
+    def open_many(self, urls):
+        """Open URLs as tabs of one window with a single browser launch"""
+        urls = list(urls)
+        if len(urls) == 1:
+            self.open(urls[0])
+            return
+        browser = find_browser() if self.command is None else None
+        command = self.command or ([browser] if browser else None)
+        if command:
+            try:
+                self._spawn(command, urls)
+                return
+            except OSError:
+                pass
+        import webbrowser
+        webbrowser.open_new(urls[0])
+        for url in urls[1:]:
+            webbrowser.open_new_tab(url)
+
+    @staticmethod
+    def _spawn(command, urls):
+        subprocess.Popen([*command, *urls], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def close(self):
+        pass
+
+
+class RequestSent(Exception):
+    """A DevTools request failed after it was sent, so it may have taken effect"""
+
+
+def _target_id(body):
+    """Id of the target described by a /json/new response, or None"""
+    try:
+        return json.loads(body).get('id')
+    except (ValueError, AttributeError):
+        return None
+
+
+class DevToolsLauncher:
+    """Tabs opened through a Chromium DevTools endpoint over one kept-alive connection"""
+
+    name = "devtools"
+
+    def __init__(self, port=DEVTOOLS_PORT, fallback=None, host=HOST):
+        self.host = host
+        self.port = port
+        self.fallback = fallback or WebbrowserLauncher()
+        self.available = False
+        self._conn = None
+        self._lock = threading.Lock()  # One request at a time on the shared connection
+        self._probing = False
+        self._probed_at = None
+
+    def check(self):
+        """Whether the endpoint answers like a browser (blocks up to PROBE_TIMEOUT)"""
+        import http.client  # Loaded off the startup path, only for this backend
+        self._probed_at = time.monotonic()
+        try:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=PROBE_TIMEOUT)
+            try:
+                conn.request("GET", "/json/version")
+                response = conn.getresponse()
+                ok = response.status == 200 and 'Browser' in json.loads(response.read())
+            finally:
+                conn.close()
+        except (OSError, ValueError, http.client.HTTPException):
+            ok = False
+        self.available = ok
+        return ok
+
+    def probe(self):
+        """Start a background check unless one is running or ran recently"""
+        now = time.monotonic()
+        if self._probing or (self._probed_at is not None and now - self._probed_at < PROBE_INTERVAL):
+            return
+        self._probing = True
+        self._probed_at = now
+
+        def run():
+            try:
+                self.check()
+            finally:
+                self._probing = False
+        threading.Thread(target=run, daemon=True).start()
+
+    def _request(self, method, path):
+        """Send one request on the kept-alive connection and return the response body
+
+        Raises RequestSent if it failed after the request went out, when the
+        browser may already have acted on it.
+        """
+        import http.client
+        if self._conn is not None and self._stale():
+            self._reset()  # The browser closed the idle connection
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        try:
+            self._conn.request(method, path)
+        except (OSError, http.client.HTTPException):
+            self._reset()
+            raise
+        try:
+            response = self._conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self._reset()
+            raise RequestSent(f"{method} {path}: {e}") from e
+        if response.will_close:
+            self._reset()
+        if response.status != 200:
+            raise http.client.HTTPException(f"DevTools answered {response.status}")
+        return body
+
+    def _stale(self):
+        """Whether the idle connection has been closed (it is readable before any request)"""
+        import select
+        sock = self._conn.sock
+        if sock is None:
+            return True
+        try:
+            return bool(select.select([sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _reset(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def open(self, url):
+        """Open one URL in a new tab"""
+        self.open_many([url])
+
+    def open_many(self, urls):
+        """Open URLs as new tabs and bring the first one to the front"""
+        urls = list(urls)
+        if not self.available:
+            self.probe()
+            self.fallback.open_many(urls)
+            return
+        import http.client
+        opened = 0
+        first = None
+        with self._lock:
+            try:
+                for url in urls:
+                    try:
+                        body = self._request("PUT", "/json/new?" + quote(url, safe=""))
+                    except RequestSent:
+                        body = b""  # The tab may be open: never open it a second time
+                    if not opened:
+                        first = _target_id(body)
+                    opened += 1
+                if first:
+                    self._request("PUT", f"/json/activate/{first}")
+            except (OSError, http.client.HTTPException, RequestSent):
+                self.available = False
+                self._reset()
+        if opened < len(urls):
+            self.fallback.open_many(urls[opened:])
+
+    def close(self):
+        with self._lock:
+            self._reset()
+
+
+class FakeLauncher:
+    """Counts and remembers URLs instead of opening them"""
+
+    name = "fake"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay  # Seconds each launch takes, to simulate a slow browser
+        self.launches = 0
+        self.count = 0  # URLs opened so far
+        self.urls = collections.deque(maxlen=FAKE_KEEP)  # Most recent URLs
+        self._lock = threading.Lock()
+
+    def open(self, url):
+        self.open_many([url])
+
+    def open_many(self, urls):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.launches += 1
+            for url in urls:
+                self.urls.append(url)
+                self.count += 1
+
+    def close(self):
+        pass
+
+
+def create_launcher(settings):
+    """Launcher backend for the 'launcher' and 'devtools_port' settings
+
+    The DevTools backend checks its endpoint before returning, so call this
+    off the UI thread.  Unknown names, including 'auto' from older settings
+    files, get the webbrowser backend.
+    """
+    name = settings.get('launcher', 'webbrowser')
+    if name == 'fake':
+        return FakeLauncher()
+    if name == 'devtools':
+        launcher = DevToolsLauncher(settings.get('devtools_port', DEVTOOLS_PORT))
+        launcher.check()
+        return launcher
+    return WebbrowserLauncher()
+
+
+_launcher = None
+_settings = {}
+_lock = threading.Lock()  # Batch mode opens URLs from several threads
+
+
+def configure_launcher(settings):
+    """Use the backend these settings choose, created on the next launch"""
+    global _settings
+    with _lock:
+        _settings = dict(settings)
+    set_launcher(None)
+
+
+def get_launcher():
+    """The current launcher, created from the configured settings on first use"""
+    global _launcher
+    with _lock:
+        if _launcher is None:
+            _launcher = create_launcher(_settings)
+        return _launcher
+
+
+def set_launcher(launcher):
+    """Replace the launcher used by open_url and open_urls (None: create it again)"""
+    global _launcher
+    with _lock:
+        if _launcher is not None and _launcher is not launcher:
+            _launcher.close()
+        _launcher = launcher
+
+
+def open_url(url):
+    """Open one URL in the browser"""
+    get_launcher().open(url)
+
+
+def open_urls(urls):
+    """Open URLs as tabs, with one launch where the backend allows it"""
+    get_launcher().open_many(urls)
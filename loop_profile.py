@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+import time
+import traceback
+
+# -- Event-loop profiling --
+# Enabled with "widget.py --profile-loop [--stall-ms N]".  Every Tcl-to-Python
+# callback (bindings, button commands, after() jobs) passes through
+# tkinter.CallWrapper, so wrapping its __call__ times all of them without
+# touching the call sites.  Durations go into per-callback log2 histograms.
+# A watchdog thread notices a callback still running past the stall
+# threshold and snapshots the main thread's stack at that moment, which
+# shows where the loop is stuck rather than where it finished.  The report
+# is printed on exit and from the diagnostics window.
+
+STALL_MS = 100  # Callbacks running longer than this are reported as stalls
+BUCKETS_MS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)  # Histogram upper bounds
+MAX_STALLS = 20  # Stack snapshots kept
+
+enabled = False
+threshold_ms = STALL_MS
+stats = {}  # label -> CallbackStats
+stalls = []  # (label, ms when caught, formatted stack)
+_active = []  # [label, started, caught] for callbacks running on the main thread
+_original_call = None
+
+
+class CallbackStats:
+    """Count, total, worst and a log2 histogram of one callback's durations"""
+
+    __slots__ = ('count', 'total', 'worst', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.worst = max(self.worst, ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms < bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+
+def _label(wrapper):
+    """Readable name for the function behind a CallWrapper"""
+    func, kind = wrapper.func, "event" if wrapper.subst else "command"
+    code = getattr(func, '__code__', None)
+    if code is not None and code.co_name == 'callit' and 'func' in code.co_freevars:
+        # after() wraps the job in a closure; report the job itself
+        func = func.__closure__[code.co_freevars.index('func')].cell_contents
+        kind = "after"
+        code = getattr(func, '__code__', None)
+    name = getattr(func, '__qualname__', type(func).__name__)
+    if code is not None and code.co_name == '<lambda>':
+        name += f" ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return f"{kind} {name}"
+
+
+def _timed_call(self, *args):
+    """CallWrapper.__call__ replacement that times the callback"""
+    entry = [_label(self), time.perf_counter(), False]
+    _active.append(entry)
+    try:
+        return _original_call(self, *args)
+    finally:
+        _active.pop()
+        ms = (time.perf_counter() - entry[1]) * 1000
+        stats.setdefault(entry[0], CallbackStats()).add(ms)
+
+
+def _watchdog(main_id, threshold):
+    """Snapshot the main thread's stack when a callback overruns the threshold"""
+    while enabled:
+        time.sleep(threshold / 4)
+        try:
+            entry = _active[-1]
+        except IndexError:
+            continue
+        elapsed = time.perf_counter() - entry[1]
+        if elapsed < threshold or entry[2]:
+            continue
+        entry[2] = True
+        frame = sys._current_frames().get(main_id)
+        if frame is not None and len(stalls) < MAX_STALLS:
+            stalls.append((entry[0], elapsed * 1000, "".join(traceback.format_stack(frame))))
+
+
+def enable(stall_ms=STALL_MS):
+    """Start timing every Tk callback on this interpreter"""
+    global enabled, threshold_ms, _original_call
+    import tkinter
+    if enabled:
+        return
+    enabled = True
+    threshold_ms = stall_ms
+    _original_call = tkinter.CallWrapper.__call__
+    tkinter.CallWrapper.__call__ = _timed_call
+    threading.Thread(target=_watchdog, args=(threading.get_ident(), stall_ms / 1000),
+                     daemon=True).start()
+
+
+def summary_lines(limit=5):
+    """Short lines for the diagnostics window: slowest callbacks and stall count"""
+    if not enabled:
+        return ["Event-loop profiling is off (start with --profile-loop)"]
+    slowest = sorted(stats.items(), key=lambda item: item[1].worst, reverse=True)[:limit]
+    lines = [f"Callback stalls over {threshold_ms} ms: {len(stalls)}"]
+    for label, s in slowest:
+        lines.append(f"{label}: n={s.count}  avg {s.total / s.count:.1f} ms  max {s.worst:.1f} ms")
+    return lines
+
+
+def report(out=None):
+    """Print the per-callback histograms and the captured stall stacks"""
+    out = out or sys.stderr
+    header = "".join(f"{'<' + str(b):>6}" for b in BUCKETS_MS) + f"{'>=' + str(BUCKETS_MS[-1]):>7}"
+    print(f"== Tk callbacks (ms) ==\n{'count':>7} {'avg':>7} {'max':>8} {header}  callback", file=out)
+    for label, s in sorted(stats.items(), key=lambda item: item[1].total, reverse=True):
+        row = "".join(f"{n:6d}" for n in s.buckets[:-1]) + f"{s.buckets[-1]:7d}"
+        print(f"{s.count:7d} {s.total / s.count:7.1f} {s.worst:8.1f} {row}  {label}", file=out)
+    print(f"== Stalls over {threshold_ms} ms: {len(stalls)} ==", file=out)
+    for label, ms, stack in stalls:
+        print(f"-- {label} (still running after {ms:.0f} ms) --\n{stack}", file=out)
+    out.flush()
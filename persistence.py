@@ -0,0 +1,125 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+# -- Background persistence --
+# All whole-file saves (settings, history snapshots) go through one writer
+# thread.  Saves of the same file that arrive within COALESCE_WINDOW are
+# merged so only the newest content is written.  Each write goes to a temp
+# file in the same folder, is fsynced according to the policy and then
+# atomically renamed over the target, so a crash leaves either the old or
+# the new file, never half of one.  Failures are queued for the UI to show
+# instead of being swallowed.
+
+COALESCE_WINDOW = 0.25  # Seconds to wait for more saves before writing
+FSYNC_POLICIES = ("always", "exit", "never")  # fsync every write / only when flushing on exit / never
+
+
+class PersistenceWriter:
+    """Single background thread that coalesces and atomically writes files"""
+
+    def __init__(self, fsync="always", window=COALESCE_WINDOW):
+        self.fsync = fsync if fsync in FSYNC_POLICIES else "always"
+        self.window = window
+        self.errors = queue.Queue()  # (path, message) for the UI thread
+        self.writes = 0  # Files actually written
+        self.coalesced = 0  # Saves merged into a later one
+        self._pending = {}  # path -> (data, [callbacks])
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def schedule(self, path, data, on_written=None):
+        """Queue data (str, or a callable returning str) to replace the file at path"""
+        with self._cond:
+            if path in self._pending:
+                self.coalesced += 1
+                callbacks = self._pending[path][1]
+            else:
+                callbacks = []
+            if on_written:
+                callbacks.append(on_written)
+            self._pending[path] = (data, callbacks)
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every scheduled save has been written"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        """Flush on exit (fsyncing if the policy asks for it) and stop the thread"""
+        if self._closed:
+            return
+        if self.fsync == "exit":
+            self.fsync = "always"
+        self.flush(timeout=5)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def drain_errors(self):
+        """Collect write failures; call from the UI thread"""
+        errors = []
+        while True:
+            try:
+                errors.append(self.errors.get_nowait())
+            except queue.Empty:
+                return errors
+
+    def _run(self):
+        """Writer loop: wait for saves, let them coalesce, then write them"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+            time.sleep(self.window)
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                self._busy = True
+            try:
+                for path, (data, callbacks) in batch.items():
+                    self._write(path, data, callbacks)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, path, data, callbacks):
+        """Atomically replace one file, then run its callbacks"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            text = data() if callable(data) else data
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                if self.fsync == "always":
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self.writes += 1
+        except Exception as e:
+            self.errors.put((path, str(e)))
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.errors.put((path, str(e)))
@@ -0,0 +1,89 @@
+# -- Query grammar --
+#   "rust traits !so"        search StackOverflow (bangs may lead or trail)
+#   "!yt !w lofi beats"      search YouTube and Wikipedia
+#   "!stack borrow checker"  unambiguous partial shortcuts resolve too
+#   "!dev segfault"          engine group names fan out to every member
+#   "rust traits`14"         legacy backtick suffix: position, id or alias
+# Shortcuts are the engine positions, ids, aliases and group names from the registry,
+# resolved through a prefix trie so lookup cost depends only on the token
+# length.  Tokens that are not known shortcuts stay part of the query.
+
+BANG = "!"
+BACKTICK = "`"
+
+
+class _Node:
+    __slots__ = ('children', 'engine', 'only')
+
+    def __init__(self):
+        self.children = {}
+        self.engine = None  # Engine whose shortcut ends exactly here
+        self.only = None  # The single engine reachable below, or False if several
+
+
+class ShortcutTrie:
+    """Prefix trie from shortcut text to engines"""
+
+    def __init__(self):
+        self.root = _Node()
+
+    @classmethod
+    def from_registry(cls, registry):
+        """Index every position, id and alias, then the engine groups"""
+        trie = cls()
+        for engine in registry:
+            for key in (str(engine.position), engine.id, *engine.aliases):
+                trie.insert(key, engine)
+        for name, group in registry.groups.items():
+            trie.insert(name, group)
+        return trie
+
+    def insert(self, key, engine):
+        """Add a shortcut (engine or group); the first to claim an exact key keeps it"""
+        node = self.root
+        for char in key.lower():
+            node = node.children.setdefault(char, _Node())
+            if node.only is None:
+                node.only = engine
+            elif node.only is not engine:
+                node.only = False
+        if node.engine is None:
+            node.engine = engine
+
+    def resolve(self, token):
+        """Engine or group for an exact or unambiguous partial shortcut, else None"""
+        node = self.root
+        for char in token.lower():
+            node = node.children.get(char)
+            if node is None:
+                return None
+        if node is self.root:
+            return None
+        return node.engine or node.only or None
+
+
+def parse_query(text, shortcuts):
+    """Split raw entry text into (query, engines named by shortcuts)"""
+    chosen = []
+    words = []
+    for word in text.split():
+        target = shortcuts.resolve(word[1:]) if word.startswith(BANG) and len(word) > 1 else None
+        if target is None:
+            words.append(word)
+            continue
+        for engine in getattr(target, 'engines', (target,)):
+            if engine not in chosen:
+                chosen.append(engine)
+    # Only re-join when a bang was removed, so spacing inside queries survives
+    query = " ".join(words) if chosen else text.strip()
+
+    # Legacy quick selection: "query`N"
+    if BACKTICK in query:
+        base, key = query.rsplit(BACKTICK, 1)
+        target = shortcuts.resolve(key.strip()) if key.strip() else None
+        if target and base.strip():
+            query = base.strip()
+            for engine in getattr(target, 'engines', (target,)):
+                if engine not in chosen:
+                    chosen.append(engine)
+    return query, chosen
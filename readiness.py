@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+
+# -- Page readiness detection --
+# Instead of always sleeping a fixed time before typing into an AI chat page,
+# the dispatcher polls a ReadinessProbe until the page shows up.  Observed
+# waits are kept per engine so that, when no probe is available, the fixed
+# fallback delay adapts to how long the page actually took in the past.
+
+DEFAULT_WAIT = 6.0  # Fallback wait (seconds) for engines never measured
+READY_TIMEOUT = 15.0  # Default give-up time while polling
+POLL_INTERVAL = 0.1
+SETTLE_DELAY = 0.5  # Extra time for the input box once the page title appears
+WAIT_MARGIN = 1.25  # Safety factor applied to the learned wait
+SMOOTHING = 0.3  # Weight of the newest observation in the moving average
+
+
+class ReadinessProbe:
+    """Interface for detecting that an engine page is ready for input"""
+
+    def start(self, hint):
+        """Called right before the page is opened; hint names the page"""
+
+    def is_ready(self):
+        """Return True once the page can receive the prompt"""
+        raise NotImplementedError
+
+
+class WindowTitleProbe(ReadinessProbe):
+    """Windows probe: the foreground window title changes to mention the hint"""
+
+    def __init__(self):
+        import win32gui
+        self.win32gui = win32gui
+
+    def start(self, hint):
+        self.hint = hint.lower()
+        self.initial = self._foreground()
+
+    def _foreground(self):
+        win32gui = self.win32gui
+        hwnd = win32gui.GetForegroundWindow()
+        return hwnd, win32gui.GetWindowText(hwnd)
+
+    def is_ready(self):
+        current = self._foreground()
+        return current != self.initial and self.hint in current[1].lower()
+
+
+class FakeProbe(ReadinessProbe):
+    """Test probe that becomes ready after a number of polls"""
+
+    def __init__(self, ready_after=0):
+        self.ready_after = ready_after
+        self.polls = 0
+        self.hints = []
+
+    def start(self, hint):
+        self.polls = 0
+        self.hints.append(hint)
+
+    def is_ready(self):
+        self.polls += 1
+        return self.polls > self.ready_after
+
+
+def default_probe():
+    """Best available probe for this platform, or None to use timed waits"""
+    try:
+        return WindowTitleProbe()
+    except ImportError:
+        return None
+
+
+def wait_until_ready(probe, timeout=READY_TIMEOUT, interval=POLL_INTERVAL,
+                     clock=time.monotonic, sleep=time.sleep):
+    """Poll probe until ready; return the elapsed seconds or None on timeout"""
+    started = clock()
+    while True:
+        if probe.is_ready():
+            return clock() - started
+        if clock() - started >= timeout:
+            return None
+        sleep(interval)
+
+
+class WaitStats:
+    """Per-engine moving average of observed page-ready waits"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.waits = {}
+        self._lock = threading.Lock()
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.waits = {k: float(v) for k, v in json.load(f).items()}
+            except (OSError, ValueError, AttributeError):
+                pass
+
+    def expected(self, engine):
+        """Wait to use when the page cannot be observed"""
+        with self._lock:
+            if engine in self.waits:
+                return self.waits[engine] * WAIT_MARGIN
+        return DEFAULT_WAIT
+
+    def record(self, engine, elapsed):
+        """Fold an observed wait into the engine's average and persist it"""
+        with self._lock:
+            old = self.waits.get(engine)
+            self.waits[engine] = elapsed if old is None else old + SMOOTHING * (elapsed - old)
+            waits = dict(self.waits)
+        if self.path:
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(waits, f, indent=2)
+            except OSError:
+                pass
@@ -0,0 +1,167 @@
+import json
+import os
+
+from analytics import Analytics
+from history_store import JournaledHistory, SQLiteHistory
+from launcher import configure_launcher
+from persistence import PersistenceWriter
+from engine_registry import EngineRegistry
+from fuzzy import FuzzyIndex
+from query_parser import ShortcutTrie, parse_query
+from startup_profile import phase
+from timestamps import now
+from usage import UsageAggregate
+
+# -- Search core --
+# Everything a search needs that does not involve a window: settings and
+# history files, the engine registry, query parsing, URL building and
+# history recording.  Used by the widget and by the headless batch mode.
+
+# Data files live next to the script unless SEARCH_WIDGET_HOME points
+# elsewhere (used by the benchmarks to run against generated histories)
+WIDGET_DIR = os.environ.get("SEARCH_WIDGET_HOME") or os.path.dirname(os.path.abspath(__file__))
+
+# -- Configuration --
+MAX_HISTORY = 100  # Default for the max_history setting (history kept in memory)
+
+# -- File Paths --
+HISTORY_FILE = os.path.join(WIDGET_DIR, "search_history.json")
+SETTINGS_FILE = os.path.join(WIDGET_DIR, "widget_settings.json")
+HISTORY_DB_FILE = os.path.join(WIDGET_DIR, "search_history.db")
+ENGINE_WAITS_FILE = os.path.join(WIDGET_DIR, "engine_waits.json")
+ENGINES_FILE = os.path.join(WIDGET_DIR, "engines.json")
+USAGE_FILE = os.path.join(WIDGET_DIR, "search_usage.json")
+ANALYTICS_FILE = os.path.join(WIDGET_DIR, "search_analytics.json")
+
+def read_settings_file():
+    """Raw settings from widget_settings.json ({} if missing or invalid)"""
+    try:
+        with open(SETTINGS_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Single background writer for settings and history snapshots
+WRITER = PersistenceWriter(fsync=read_settings_file().get('fsync_policy', 'always'))
+
+# Browser launcher backend (webbrowser, DevTools session or fake; see launcher.py),
+# created on the first search
+configure_launcher(read_settings_file())
+
+# -- History Management --
+def open_history_store():
+    """Create the history backend chosen by the 'history_backend' setting"""
+    settings = read_settings_file()
+    capacity = settings.get('max_history', MAX_HISTORY)
+    if settings.get('history_backend') == 'sqlite':
+        try:
+            # Migrates search_history.json into the database on first start
+            return SQLiteHistory(HISTORY_DB_FILE, legacy_path=HISTORY_FILE, capacity=capacity)
+        except Exception:
+            pass
+    return JournaledHistory(HISTORY_FILE, capacity=capacity, writer=WRITER)
+
+_history_store = open_history_store()
+
+def load_history():
+    """Load search history by replaying the snapshot and journal"""
+    try:
+        entries = _history_store.load()
+    except OSError as e:
+        WRITER.errors.put((HISTORY_FILE, str(e)))
+        return _history_store.entries
+    for error in getattr(_history_store, 'load_errors', ()):
+        WRITER.errors.put((HISTORY_FILE, error))
+    return entries
+
+def save_history(history):
+    """Rewrite the full history snapshot (used when clearing history)"""
+    try:
+        _history_store.rewrite(history)
+    except OSError as e:
+        WRITER.errors.put((HISTORY_FILE, str(e)))
+
+def record_history(entry):
+    """Append a single search to the history journal"""
+    record_history_batch((entry,))
+
+def record_history_batch(entries):
+    """Append several searches (a fan-out) in one write"""
+    try:
+        _history_store.append_many(entries)
+    except OSError as e:
+        WRITER.errors.put((HISTORY_FILE, str(e)))
+    USAGE.record(entries)
+    if _analytics is not None:
+        _analytics.record(entries)
+
+def iter_stored_history():
+    """Stream the whole stored history (not just the in-memory part), oldest first"""
+    return _history_store.iter_all()
+
+# Load existing history
+with phase("load_history"):
+    history = load_history()
+with phase("load_usage"):
+    # Deduplicated (engine, query) counts, kept beyond the history cap
+    USAGE = UsageAggregate.load(USAGE_FILE, history, writer=WRITER)
+with phase("load_analytics"):
+    # Cached statistics; None until first computed (see get_analytics)
+    _analytics = Analytics.load(ANALYTICS_FILE, history, writer=WRITER)
+
+def replace_stored_history(entries):
+    """Replace the whole stored history with a stream of entries, oldest first
+
+    Usage counts and analytics are recomputed from the new history.  Returns
+    how many of the oldest entries did not fit in max_history.
+    """
+    global _analytics
+    dropped = _history_store.replace_all(entries)
+    USAGE.rebuild(iter_stored_history())
+    _analytics = Analytics(ANALYTICS_FILE, writer=WRITER)
+    _analytics.rebuild(iter_stored_history())
+    return dropped
+
+def get_analytics():
+    """Usage analytics, computed in one pass over the stored history the first time"""
+    global _analytics
+    if _analytics is None:
+        _analytics = Analytics.load(ANALYTICS_FILE, history, stream=iter_stored_history, writer=WRITER)
+    return _analytics
+
+def loaded_analytics():
+    """Usage analytics if already available, without computing them"""
+    return _analytics
+
+# -- Engines (built-in plus the user's engines.json, see engine_registry.py) --
+ENGINES = EngineRegistry.load(ENGINES_FILE)
+for _error in ENGINES.errors:  # Skipped definitions, shown by the widget's error dialog
+    WRITER.errors.put((ENGINES_FILE, _error))
+SHORTCUTS = ShortcutTrie.from_registry(ENGINES)
+# Ids, aliases and group names for correcting mistyped !bangs
+SHORTCUT_NAMES = FuzzyIndex.from_texts(
+    [key for e in ENGINES for key in (e.id, *e.aliases)] + list(ENGINES.groups)
+)
+engines = ENGINES.labels
+
+# -- Search planning --
+def plan_search(text, default_engine):
+    """Resolve entry text into (query, engines); default_engine is used without shortcuts"""
+    query, chosen = parse_query(text.strip(), SHORTCUTS)
+    if not chosen and default_engine is not None:
+        chosen = [default_engine]
+    return query, chosen
+
+def correct_shortcut(token):
+    """Closest known shortcut to a mistyped one (without the '!'), or None"""
+    matches = SHORTCUT_NAMES.matches(token, 1)
+    return matches[0][1] if matches else None
+
+def build_searches(query, chosen):
+    """Dispatch tuples (label, url, query, delivery) for each chosen engine"""
+    return [(e.title, e.build_url(query), query, e.delivery) for e in chosen]
+
+def record_searches(query, chosen, timestamp=None):
+    """Add one history entry per engine in a single write"""
+    timestamp = timestamp or now()
+    record_history_batch([(timestamp, engine.label, query) for engine in chosen])
@@ -0,0 +1,71 @@
+import builtins
+import sys
+import time
+from contextlib import contextmanager
+
+# -- Startup profiling --
+# Enabled with "widget.py --profile-startup".  Times every first-time import
+# (inclusive of the modules it pulls in) and the named startup phases, then
+# reports the time from launch until the search entry is interactive.
+
+START = time.perf_counter()
+STARTUP_BUDGET_MS = 400  # Target launch-to-interactive time
+
+enabled = False
+imports = []  # (depth, module, ms) in completion order
+phases = []  # (phase, ms)
+_depth = 0
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """__import__ wrapper that records how long new modules take to load"""
+    global _depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        imports.append((_depth, name, (time.perf_counter() - started) * 1000))
+
+
+def enable():
+    """Start recording imports and phases"""
+    global enabled
+    enabled = True
+    builtins.__import__ = _timed_import
+
+
+@contextmanager
+def phase(name):
+    """Time a startup phase (no-op unless profiling is enabled)"""
+    if not enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.append((name, (time.perf_counter() - started) * 1000))
+
+
+def report(out=None, min_ms=0.5):
+    """Print import and phase timings plus the launch-to-interactive total"""
+    out = out or sys.stdout
+    total = (time.perf_counter() - START) * 1000
+    builtins.__import__ = _original_import
+    print("== Imports (ms, inclusive) ==", file=out)
+    for depth, name, ms in imports:
+        if ms >= min_ms:
+            print(f"{ms:9.1f}  {'  ' * depth}{name}", file=out)
+    print("== Phases (ms) ==", file=out)
+    for name, ms in phases:
+        print(f"{ms:9.1f}  {name}", file=out)
+    verdict = "OK" if total <= STARTUP_BUDGET_MS else "OVER BUDGET"
+    print(f"== Interactive after {total:.1f} ms (budget {STARTUP_BUDGET_MS} ms: {verdict}) ==",
+          file=out)
+    out.flush()
+    return total
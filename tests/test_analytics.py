@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from analytics import Analytics
+
+FANOUT = [(100.0, "Google", "segfault"), (100.0, "Stack Overflow", "segfault"),
+          (100.0, "Reddit", "segfault")]
+
+
+class AnalyticsLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "search_analytics.json")
+
+    def cache(self, entries):
+        analytics = Analytics()
+        analytics.rebuild(entries)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(analytics._dumps())
+
+    def test_catches_up_on_rest_of_fanout_at_cached_time(self):
+        history = [(50.0, "Bing", "rust")] + FANOUT + [(120.0, "Google", "later")]
+        self.cache(history[:3])  # Saved midway through the fan-out
+        analytics = Analytics.load(self.path, history)
+        self.assertEqual(analytics.total, len(history))
+        self.assertEqual(analytics.engine_counts()[0], ("Google", 2))
+
+    def test_up_to_date_cache_not_recounted(self):
+        self.cache(FANOUT)
+        self.assertEqual(Analytics.load(self.path, FANOUT).total, 3)
+
+    def test_cache_without_timestamps_rebuilt(self):
+        self.cache([("10:30", "Google", "legacy")])
+        self.assertIsNone(Analytics.load(self.path, FANOUT))
+        analytics = Analytics.load(self.path, FANOUT, stream=lambda: iter(FANOUT))
+        self.assertEqual(analytics.total, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
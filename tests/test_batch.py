@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import instance
+from history_store import iter_entries
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BatchHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+
+    def batch(self, *options):
+        env = dict(os.environ, SEARCH_WIDGET_HOME=self.home)
+        return subprocess.run(
+            [sys.executable, os.path.join(HERE, "widget.py"), "--batch", "-", "--launcher", "fake",
+             *options],
+            input="rust traits\n", env=env, capture_output=True, text=True, timeout=60
+        )
+
+    def start_widget(self):
+        """Stand in for a running widget owning this home"""
+        patcher = mock.patch.object(instance, 'INSTANCE_FILE', os.path.join(self.home, "instance.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        server = instance.InstanceServer.start(lambda request: None, port=0)
+        self.addCleanup(server.close)
+
+    def stored(self):
+        return [e[2] for e in iter_entries(os.path.join(self.home, "search_history.json"))]
+
+    def test_records_without_running_widget(self):
+        result = self.batch()
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(self.stored(), ["rust traits"])
+
+    def test_refuses_to_record_while_widget_runs(self):
+        self.start_widget()
+        result = self.batch()
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("--no-history", result.stderr)
+        self.assertEqual(self.stored(), [])
+
+    def test_no_history_runs_while_widget_runs(self):
+        self.start_widget()
+        self.assertEqual(self.batch("--no-history").returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
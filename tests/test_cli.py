@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import cli
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("batch", "analytics", "history_io", "search_core", "tkinter")
+
+
+class ParseArgsTest(unittest.TestCase):
+
+    def test_all_modes_parse(self):
+        args = cli.parse_args(["--batch", "-", "--dry-run", "--stats", "--top", "3",
+                               "--import", "a.jsonl", "b.csv", "--out", "x.jsonl"])
+        self.assertEqual((args.batch, args.top, args.import_files), ("-", 3, ["a.jsonl", "b.csv"]))
+
+    def test_gui_launch_is_not_headless(self):
+        self.assertIsNone(cli.run_headless(cli.parse_args([])))
+
+    def test_parsing_imports_no_mode(self):
+        code = ("import sys, cli; cli.parse_args(['--stats-file', 'h.json']); "
+                f"print([m for m in {HEAVY!r} if m in sys.modules])")
+        out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True,
+                             text=True, check=True).stdout
+        self.assertEqual(out.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import sys
+import types
+import unittest
+from unittest import mock
+
+import delivery
+
+
+class PasteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clipboard = "user's own text"
+        self.events = []
+        pyperclip = types.SimpleNamespace(paste=lambda: self.clipboard, copy=self.copy)
+        pyautogui = types.SimpleNamespace(
+            click=lambda **kw: None,
+            hotkey=lambda *keys: self.events.append(("paste", self.clipboard)),
+            press=lambda key: self.events.append((key, self.clipboard)),
+        )
+        modules = {'pyperclip': pyperclip, 'pyautogui': pyautogui, 'win32clipboard': None}
+        patcher = mock.patch.dict(sys.modules, modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(delivery, 'RESTORE_DELAY', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def copy(self, text):
+        self.clipboard = text
+
+    def test_prompt_pasted_and_clipboard_restored(self):
+        self.assertEqual(delivery.deliver_prompt("paste", "explain traits", lambda s: None), "paste")
+        self.assertEqual(self.events, [("paste", "explain traits"), ("enter", "user's own text")])
+        self.assertEqual(self.clipboard, "user's own text")
+
+    def test_clipboard_restored_when_paste_fails(self):
+        sys.modules['pyautogui'].hotkey = mock.Mock(side_effect=RuntimeError("no display"))
+        with self.assertRaises(RuntimeError):
+            delivery.paste_prompt("explain traits", lambda s: None)
+        self.assertEqual(self.clipboard, "user's own text")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+
+import dispatch
+from readiness import FakeProbe, WaitStats
+
+
+class WaitForPageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.statuses = []
+        patcher = mock.patch.object(dispatch, 'SETTLE_DELAY', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait(self, probe, stats, timeout=1.0):
+        dispatch.wait_for_page("ChatGPT", probe, stats, timeout, self.statuses.append)
+
+    def test_observed_wait_recorded(self):
+        stats = WaitStats()
+        stats.record("ChatGPT", 0.08)  # Learned budget 0.1s: ready within it
+        self.wait(FakeProbe(ready_after=0), stats)
+        self.assertLess(stats.waits["ChatGPT"], 0.08)
+        self.assertEqual(self.statuses, ["waiting"])
+
+    def test_slower_than_learned_keeps_polling_and_learns(self):
+        stats = WaitStats()
+        stats.record("ChatGPT", 0.04)  # Budget 0.05s, page ready after ~0.2s
+        self.wait(FakeProbe(ready_after=2), stats)
+        self.assertIn("still waiting", self.statuses)
+        self.assertGreater(stats.waits["ChatGPT"], 0.04)
+
+    def test_timeout_returns_for_delivery_and_reports(self):
+        stats = WaitStats()
+        stats.record("ChatGPT", 0.04)
+        self.wait(FakeProbe(ready_after=100), stats, timeout=0.2)
+        self.assertTrue(self.statuses[-1].startswith("not ready after"))
+        self.assertEqual(stats.waits["ChatGPT"], 0.04)  # A timeout is not a measurement
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import json
+import os
+import tempfile
+import unittest
+
+from engine_registry import EngineRegistry
+
+
+class RegistryErrorsTest(unittest.TestCase):
+
+    def load(self, custom):
+        path = os.path.join(tempfile.mkdtemp(), "engines.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(custom if isinstance(custom, str) else json.dumps(custom))
+        return EngineRegistry.load(path)
+
+    def test_bad_definitions_reported_and_skipped(self):
+        registry = self.load([{'id': "bad", 'name': "Bad", 'url': "no-scheme"}, {'name': "No id"}])
+        self.assertIsNone(registry.get("bad"))
+        self.assertEqual(len(registry.errors), 2)
+        self.assertIsNotNone(registry.get("google"))
+
+    def test_unreadable_file_reported(self):
+        registry = self.load("[{")
+        self.assertEqual(len(registry.errors), 1)
+        self.assertTrue(registry.engines)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+import fuzzy
+from fuzzy import FuzzyIndex, edit_distance
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FuzzyIndexTest(unittest.TestCase):
+
+    def test_typos_matched(self):
+        index = FuzzyIndex.from_texts(["what is tutomind", "weather today"])
+        self.assertEqual(index.did_you_mean("wat is tuotmind"), ["what is tutomind"])
+
+    def test_short_words_must_match_exactly(self):
+        index = FuzzyIndex.from_texts(["go", "rust"])
+        self.assertEqual(index.did_you_mean("gp"), [])
+        self.assertEqual(edit_distance("rust", "rsut", 1), 1)
+
+    def test_truncation_keeps_closest_then_most_used(self):
+        texts = [f"rusty crate {n}" for n in range(20)] + ["rust lang", "rusts book"]
+        uses = [1] * 20 + [1, 50]
+        index = FuzzyIndex.from_texts(texts, uses)
+        with mock.patch.object(fuzzy, 'MAX_CANDIDATES', 3):
+            keys = [key for _, key in index.matches("rust")]
+        # "rust" exactly, then the most used of the one-typo words
+        self.assertEqual(keys[:2], ["rust lang", "rusts book"])
+        self.assertEqual(len(keys), 3)
+
+    def test_truncation_independent_of_hash_seed(self):
+        code = ("import fuzzy; fuzzy.MAX_CANDIDATES = 5; "
+                "index = fuzzy.FuzzyIndex.from_texts([f'rusty {n}' for n in range(50)]"
+                " + [f'rustc {n}' for n in range(50)]); print(index.matches('rust'))")
+        outputs = {
+            subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True,
+                           env=dict(os.environ, PYTHONHASHSEED=seed), check=True).stdout
+            for seed in ("1", "2", "3")
+        }
+        self.assertEqual(len(outputs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
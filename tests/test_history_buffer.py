@@ -0,0 +1,96 @@
+import random
+import unittest
+
+from history_buffer import HistoryBuffer
+from timestamps import day_of, day_start
+
+DAY0 = day_start(day_of(1_700_000_000.0))  # Local midnight, so days line up with the index
+HOUR = 3600.0
+
+
+def entries(count, step=HOUR * 5, start=DAY0):
+    return [(start + i * step, f"engine {i % 3}", f"q{i}") for i in range(count)]
+
+
+class RingTest(unittest.TestCase):
+
+    def test_wraps_keeping_newest_in_order(self):
+        rows = entries(11)
+        buffer = HistoryBuffer(4, rows)
+        self.assertEqual(list(buffer), rows[-4:])
+        self.assertEqual(list(reversed(buffer)), rows[-4:][::-1])
+        self.assertEqual((buffer[0], buffer[-1], buffer[1:3]), (rows[7], rows[10], rows[8:10]))
+        with self.assertRaises(IndexError):
+            buffer[4]
+
+    def test_zero_capacity_keeps_nothing(self):
+        buffer = HistoryBuffer(0, entries(3))
+        self.assertEqual((len(buffer), buffer.between()), (0, []))
+
+    def test_resize_down_and_up(self):
+        rows = entries(10)
+        buffer = HistoryBuffer(6, rows)  # Wrapped
+        buffer.resize(3)
+        self.assertEqual(list(buffer), rows[-3:])
+        buffer.resize(5)
+        extra = entries(3, start=rows[-1][0] + HOUR)
+        buffer.extend(extra)
+        self.assertEqual(list(buffer), [*rows[-2:], *extra])
+        buffer.resize(None)
+        self.assertEqual(buffer.capacity, None)
+        self.assertEqual(len(buffer), 5)
+
+    def test_clear_keeps_capacity(self):
+        buffer = HistoryBuffer(2, entries(5))
+        buffer.clear()
+        buffer.extend(entries(3))
+        self.assertEqual(len(buffer), 2)
+
+
+class DayIndexTest(unittest.TestCase):
+
+    def check_ranges(self, buffer, ordered=True):
+        kept = list(buffer)
+        rng = random.Random(7)
+        times = [e[0] for e in kept]
+        bounds = [None, *times, *(t + 1 for t in times), *(DAY0 + rng.uniform(-1, 30) * HOUR * 24
+                                                           for _ in range(20))]
+        for start in bounds:
+            for end in rng.sample(bounds, 8):
+                expected = [e for e in reversed(kept)
+                            if (start is None or e[0] >= start) and (end is None or e[0] < end)]
+                got = buffer.between(start, end)
+                self.assertEqual(sorted(got), sorted(expected), (start, end))
+                if ordered:
+                    self.assertEqual([e[0] for e in got], sorted((e[0] for e in got), reverse=True))
+
+    def test_between_across_wraparound(self):
+        buffer = HistoryBuffer(13)
+        for batch in range(4):  # Wraps several times
+            buffer.extend(entries(9, start=DAY0 + batch * 9 * 5 * HOUR))
+            self.check_ranges(buffer)
+
+    def test_between_exact_day_boundaries(self):
+        rows = [(DAY0 - 1, "g", "before"), (DAY0, "g", "midnight"),
+                (DAY0 + 24 * HOUR - 1, "g", "late"), (DAY0 + 24 * HOUR, "g", "next")]
+        buffer = HistoryBuffer(10, rows)
+        day_end = day_start(day_of(DAY0) + 1)
+        self.assertEqual([e[2] for e in buffer.between(DAY0, day_end)], ["late", "midnight"])
+
+    def test_out_of_order_appends(self):
+        rows = entries(6)
+        rng = random.Random(3)
+        rng.shuffle(rows)
+        buffer = HistoryBuffer(4, rows)
+        self.check_ranges(buffer, ordered=False)
+
+    def test_expired_days_pruned(self):
+        buffer = HistoryBuffer(3)
+        buffer.extend(entries(30, step=HOUR * 24))  # One entry per day
+        self.assertEqual(len(buffer._days), 3)
+        self.assertEqual(buffer._day_order, sorted(day_of(e[0]) for e in buffer))
+        self.assertEqual(buffer.between(None, DAY0 + 27 * 24 * HOUR), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import history_io
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FANOUT = [(100.0, "Google", "segfault"), (100.0, "Stack Overflow", "segfault"),
+          (100.0, "Reddit", "segfault")]
+
+
+class MergeTest(unittest.TestCase):
+
+    def merge(self, *sources):
+        stats = history_io.new_stats()
+        return list(history_io.merge_entries(sources, stats)), stats
+
+    def test_same_timestamp_fanout_deduplicated(self):
+        merged, stats = self.merge(FANOUT, list(FANOUT))
+        self.assertEqual(merged, FANOUT)  # Group order kept, not label order
+        self.assertEqual(stats['duplicates'], 3)
+
+    def test_interleaves_sources_by_time(self):
+        a = [(1.0, "Google", "a"), (3.0, "Google", "c")]
+        b = [(2.0, "Bing", "b"), (3.0, "Google", "c"), (4.0, "Bing", "d")]
+        merged, stats = self.merge(a, b)
+        self.assertEqual([e[2] for e in merged], ["a", "b", "c", "d"])
+        self.assertEqual(stats['duplicates'], 1)
+
+    def test_same_timestamp_different_query_kept(self):
+        merged, _ = self.merge([(5.0, "Google", "x")], [(5.0, "Google", "y")])
+        self.assertEqual(len(merged), 2)
+
+    def test_skipped_rows_counted(self):
+        rows = [("10:30", "Google", "legacy"), ("soon", "Google", "bad"), (7, "Bing", "ok")]
+        merged, stats = self.merge(rows)
+        self.assertEqual(merged, [(7.0, "Bing", "ok")])
+        self.assertEqual((stats['legacy'], stats['invalid']), (1, 1))
+
+    def test_unordered_source_reported(self):
+        _, stats = self.merge([(2.0, "Google", "b"), (1.0, "Google", "a")])
+        self.assertEqual(stats['unordered'], 1)
+
+
+class FormatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def round_trip(self, name):
+        path = os.path.join(self.folder, name)
+        entries = FANOUT + [(101.5, "YouTube", 'lofi, "beats" café')]
+        self.assertEqual(history_io.write_entries(entries, path), 4)
+        self.assertEqual(list(history_io.merge_entries([history_io.read_entries(path)])), entries)
+        self.assertFalse([n for n in os.listdir(self.folder) if n.endswith('.tmp')])
+
+    def test_jsonl_round_trip(self):
+        self.round_trip("history.jsonl")
+
+    def test_csv_round_trip(self):
+        self.round_trip("history.csv")
+
+    def test_snapshot_round_trip(self):
+        self.round_trip("history.json")
+
+    def test_csv_accepts_iso_times_and_column_order(self):
+        path = os.path.join(self.folder, "edited.csv")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("query,engine,timestamp\nrust,Google,2024-05-01 10:30\n")
+        (entry,) = history_io.merge_entries([history_io.read_entries(path)])
+        self.assertEqual(entry[1:], ("Google", "rust"))
+        self.assertIsInstance(entry[0], float)
+
+
+class CommandLineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()  # Stored history of the widget under test
+        self.files = tempfile.mkdtemp()
+
+    def widget(self, *argv):
+        env = dict(os.environ, SEARCH_WIDGET_HOME=self.home)
+        return subprocess.run([sys.executable, os.path.join(HERE, "widget.py"), *argv], env=env,
+                              capture_output=True, text=True, timeout=60)
+
+    def file(self, name, entries):
+        path = os.path.join(self.files, name)
+        history_io.write_entries(entries, path)
+        return path
+
+    def test_import_merges_into_stored_history(self):
+        first = self.file("laptop.jsonl", FANOUT)
+        second = self.file("desktop.csv", [(50.0, "Google", "older"), *FANOUT])
+        self.assertEqual(self.widget("--import", first).returncode, 0)
+        result = self.widget("--import", second)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        out = os.path.join(self.files, "out.jsonl")
+        self.assertEqual(self.widget("--export", out).returncode, 0)
+        self.assertEqual(list(history_io.read_entries(out)), [(50.0, "Google", "older"), *FANOUT])
+
+    def test_import_over_max_history_reports_dropped_entries(self):
+        with open(os.path.join(self.home, "widget_settings.json"), 'w', encoding='utf-8') as f:
+            f.write('{"max_history": 2}')
+        result = self.widget("--import", self.file("laptop.jsonl", [(50.0, "Google", "older"), *FANOUT]))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("stored 2 entries", result.stderr)
+        self.assertIn("dropped the 2 oldest entries", result.stderr)
+        out = os.path.join(self.files, "out.jsonl")
+        self.widget("--export", out)
+        self.assertEqual(list(history_io.read_entries(out)), FANOUT[1:])
+
+    def test_merge_and_stats_file_leave_stored_history_alone(self):
+        source = self.file("a.jsonl", FANOUT)
+        out = os.path.join(self.files, "out.jsonl")
+        self.assertEqual(self.widget("--merge", source, source, "--out", out).returncode, 0)
+        self.assertEqual(list(history_io.read_entries(out)), FANOUT)
+        result = self.widget("--stats-file", source)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(os.listdir(self.home), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import history_store
+from history_store import JournaledHistory, SQLiteHistory, iter_entries
+from persistence import PersistenceWriter
+
+
+class JournaledHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "search_history.json")
+        self.writer = PersistenceWriter(window=0)
+        self.addCleanup(self.writer.close)
+
+    def store(self, capacity=None):
+        store = JournaledHistory(self.path, capacity=capacity, writer=self.writer)
+        self.addCleanup(store.close)
+        return store
+
+    def test_legacy_times_migrated_on_disk_before_load_returns(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'generation': 0, 'entries': [["09:00", "Google", "a"], ["10:00", "Bing", "b"]]}, f)
+        entries = list(self.store().load())
+        self.assertTrue(all(isinstance(e[0], float) for e in entries))
+        self.assertEqual(list(iter_entries(self.path)), entries)
+
+    def test_torn_journal_record_truncated_on_load(self):
+        store = self.store()
+        store.load()
+        store.append_many([(1.0, "Google", "a"), (2.0, "Bing", "b")])
+        store.close()
+        journal = store.journal_path(store.generation)
+        with open(journal, 'a', encoding='utf-8') as f:
+            f.write('[3.0,"Goo')  # Crash in the middle of a write
+        store = self.store()
+        self.assertEqual([e[2] for e in store.load()], ["a", "b"])
+        with open(journal, 'r', encoding='utf-8') as f:
+            self.assertTrue(f.read().endswith('"b"]\n'))
+        store.append((4.0, "Google", "d"))
+        store.close()
+        self.assertEqual([e[2] for e in self.store().load()], ["a", "b", "d"])
+
+    def test_absorbed_journal_not_replayed(self):
+        self.write_snapshot([(1.0, "Google", "a")], generation=1)
+        with open(self.path + ".1.journal", 'w', encoding='utf-8') as f:
+            f.write('[1.0,"Google","a"]\n')  # Left behind by a crash after the snapshot write
+        self.assertEqual(len(self.store().load()), 1)
+        self.assertFalse(os.path.exists(self.path + ".1.journal"))
+
+    def test_replace_all_keeps_what_compaction_keeps(self):
+        entries = [(float(i), "Google", str(i)) for i in range(10)]
+        store = self.store(capacity=3)
+        store.load()
+        self.assertEqual(store.replace_all(iter(entries)), 7)
+        self.assertEqual(list(iter_entries(self.path)), entries[-3:])
+        store.append((10.0, "Bing", "10"))
+        store.compact(wait=True)
+        self.assertEqual([e[2] for e in iter_entries(self.path)], ["8", "9", "10"])
+
+    def test_sqlite_replace_all_capped_too(self):
+        entries = [(float(i), "Google", str(i)) for i in range(10)]
+        store = SQLiteHistory(os.path.join(self.folder, "search_history.db"), capacity=4)
+        self.addCleanup(store.close)
+        self.assertEqual(store.replace_all(iter(entries)), 6)
+        self.assertEqual(list(store.iter_all()), entries[-4:])
+
+    def write_snapshot(self, entries, generation=0):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            history_store.dump_snapshot(entries, f, generation)
+
+    def test_load_streams_snapshot_into_capped_buffer(self):
+        self.write_snapshot([(float(i), "Google", str(i)) for i in range(1000)], generation=2)
+        with open(self.path + ".3.journal", 'w', encoding='utf-8') as f:
+            f.write('[1000.0,"Bing","journal"]\n')
+        with mock.patch.object(history_store, 'STREAM_CHUNK', 256):
+            entries = list(self.store(capacity=3).load())
+        self.assertEqual([e[2] for e in entries], ["998", "999", "journal"])
+
+    def test_truncated_snapshot_set_aside(self):
+        self.write_snapshot([(float(i), "Google", str(i)) for i in range(100)])
+        with open(self.path, 'r+', encoding='utf-8') as f:
+            f.truncate(os.path.getsize(self.path) // 2)
+        store = self.store()
+        self.assertEqual(len(store.load()), 0)
+        self.assertEqual(len(store.load_errors), 1)
+        self.assertTrue(os.path.exists(self.path + ".corrupt"))
+
+    def test_garbage_snapshot_set_aside(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("not json")
+        store = self.store()
+        self.assertEqual(len(store.load()), 0)
+        self.assertTrue(os.path.exists(self.path + ".corrupt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import instance
+
+
+class InstanceDirTest(unittest.TestCase):
+
+    def test_widget_home_wins(self):
+        with mock.patch.dict(os.environ, {"SEARCH_WIDGET_HOME": "/data", "LOCALAPPDATA": "/local"}):
+            self.assertEqual(instance.instance_dir(), "/data")
+
+    def test_local_app_data_per_user(self):
+        with mock.patch.dict(os.environ, {"SEARCH_WIDGET_HOME": "", "LOCALAPPDATA": "/local"}):
+            self.assertEqual(instance.instance_dir(), os.path.join("/local", "SearchWidget"))
+
+    def test_frozen_build_uses_executable_folder(self):
+        env = {k: v for k, v in os.environ.items() if k not in ("SEARCH_WIDGET_HOME", "LOCALAPPDATA")}
+        with mock.patch.dict(os.environ, env, clear=True), \
+                mock.patch.object(sys, 'frozen', True, create=True), \
+                mock.patch.object(sys, 'executable', os.path.abspath("/apps/widget/widget.exe")):
+            self.assertEqual(instance.instance_dir(), os.path.abspath("/apps/widget"))
+
+
+class InstanceServerTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.mkdtemp()
+        patcher = mock.patch.object(instance, 'INSTANCE_FILE',
+                                    os.path.join(folder, "new", "instance.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_forwarded_request_reaches_owner(self):
+        received = []
+        server = instance.InstanceServer.start(received.append, port=0)
+        self.assertIsNotNone(server)
+        self.addCleanup(server.close)
+        self.assertTrue(instance.running())
+        self.assertTrue(instance.forward(["--query", "rust"]))
+        self.assertEqual(received, [{'action': 'search', 'query': "rust", 'engine': None}])
+        server.close()
+        self.assertFalse(os.path.exists(instance.INSTANCE_FILE))
+
+    def test_race_loser_forwards_once_winner_listens(self):
+        received, servers = [], []
+        timer = threading.Timer(0.2, lambda: servers.append(
+            instance.InstanceServer.start(received.append, port=0)))
+        timer.start()
+        self.addCleanup(lambda: [server.close() for server in servers])
+        self.assertTrue(instance.forward_when_ready(["--query", "rust"], retries=50, delay=0.05))
+        self.assertEqual([r['query'] for r in received], ["rust"])
+
+    def test_race_loser_gives_up_without_winner(self):
+        self.assertFalse(instance.forward_when_ready([], retries=2, delay=0.01))
+
+
+if __name__ == "__main__":
+    unittest.main()
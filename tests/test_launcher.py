@@ -0,0 +1,160 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import launcher
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_BROWSER = os.path.join(HERE, "fake_browser.py")
+URLS = ["https://example.com/?q=a%20b", "https://example.org/search?q=c&x=1"]
+
+
+def read_log(path, count, timeout=10.0):
+    """Lines of a fake browser log once it holds count of them"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        if len(lines) >= count or time.monotonic() > deadline:
+            return lines
+        time.sleep(0.02)
+
+
+def free_port():
+    """A local port that nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind((launcher.HOST, 0))
+        return sock.getsockname()[1]
+
+
+class FindBrowserTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(launcher, '_browser', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def find(self, default):
+        with mock.patch.object(launcher, 'default_browser', return_value=default):
+            return launcher.find_browser()
+
+    def test_default_multi_url_browser_used(self):
+        path = "/usr/bin/google-chrome-stable"
+        self.assertEqual(self.find(path), path)
+
+    def test_other_default_browser_left_to_webbrowser(self):
+        self.assertIsNone(self.find("/usr/bin/epiphany"))
+
+    def test_unknown_default_left_to_webbrowser(self):
+        self.assertIsNone(self.find(None))
+
+    def test_fanout_without_browser_opens_tabs_through_webbrowser(self):
+        with mock.patch.object(launcher, 'default_browser', return_value=None), \
+                mock.patch("webbrowser.open_new") as open_new, \
+                mock.patch("webbrowser.open_new_tab") as open_new_tab:
+            launcher.WebbrowserLauncher().open_many(["https://a", "https://b", "https://c"])
+        open_new.assert_called_once_with("https://a")
+        self.assertEqual([c.args[0] for c in open_new_tab.call_args_list], ["https://b", "https://c"])
+
+
+class LazyLauncherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(launcher.configure_launcher, {})
+
+    def test_created_on_first_use(self):
+        launcher.configure_launcher({'launcher': 'fake'})
+        self.assertIsNone(launcher._launcher)
+        launcher.open_urls(URLS)
+        self.assertEqual(list(launcher.get_launcher().urls), URLS)
+
+    def test_webbrowser_is_the_default(self):
+        for settings in ({}, {'launcher': 'auto'}):
+            launcher.configure_launcher(settings)
+            self.assertIsInstance(launcher.get_launcher(), launcher.WebbrowserLauncher)
+
+    def test_search_core_import_creates_no_launcher(self):
+        code = ("import sys, launcher, search_core; "
+                "print(launcher._launcher is None, 'http.client' in sys.modules)")
+        env = dict(os.environ, SEARCH_WIDGET_HOME=tempfile.mkdtemp())
+        out = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split(), ["True", "False"])
+
+
+class DevToolsLauncherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.log = os.path.join(tempfile.mkdtemp(), "urls.log")
+
+    def start_browser(self, *options):
+        browser = subprocess.Popen(
+            [sys.executable, FAKE_BROWSER, "--log", self.log, "--remote-debugging-port=0", *options],
+            stderr=subprocess.PIPE, text=True
+        )
+        self.addCleanup(browser.wait)
+        self.addCleanup(browser.kill)
+        line = browser.stderr.readline()  # "DevTools listening on ws://127.0.0.1:PORT/..."
+        return int(line.split(":")[2].split("/")[0])
+
+    def test_opens_tabs_over_devtools(self):
+        port = self.start_browser()
+        devtools = launcher.create_launcher({'launcher': 'devtools', 'devtools_port': port})
+        self.addCleanup(devtools.close)
+        self.assertTrue(devtools.available)
+        devtools.fallback = launcher.FakeLauncher()
+        devtools.open_many(URLS)
+        devtools.open(URLS[0])
+        self.assertEqual(read_log(self.log, 3), [*URLS, URLS[0]])
+        self.assertEqual(devtools.fallback.count, 0)
+
+    def test_tab_opened_without_answer_not_opened_again(self):
+        port = self.start_browser("--drop-replies")
+        devtools = launcher.DevToolsLauncher(port, fallback=launcher.FakeLauncher())
+        self.addCleanup(devtools.close)
+        self.assertTrue(devtools.check())
+        devtools.open_many(URLS)
+        self.assertEqual(read_log(self.log, 2), URLS)
+        self.assertEqual(devtools.fallback.count, 0)
+
+    def test_idle_connection_closed_by_browser_is_replaced(self):
+        port = self.start_browser()
+        devtools = launcher.DevToolsLauncher(port, fallback=launcher.FakeLauncher())
+        self.addCleanup(devtools.close)
+        self.assertTrue(devtools.check())
+        devtools.open(URLS[0])
+        self.assertFalse(devtools._stale())
+        devtools._conn.sock.shutdown(socket.SHUT_RD)  # Reads now see EOF, as after a close
+        self.assertTrue(devtools._stale())
+        devtools.open(URLS[1])
+        self.assertEqual(read_log(self.log, 2), URLS)
+        self.assertEqual(devtools.fallback.count, 0)
+
+    def test_falls_back_while_endpoint_is_down(self):
+        devtools = launcher.DevToolsLauncher(free_port(), fallback=launcher.FakeLauncher())
+        self.assertFalse(devtools.check())
+        devtools.open_many(URLS)
+        self.assertEqual(list(devtools.fallback.urls), URLS)
+
+
+class WebbrowserLauncherTest(unittest.TestCase):
+
+    def test_fanout_is_one_browser_launch(self):
+        log = os.path.join(tempfile.mkdtemp(), "urls.log")
+        command = [sys.executable, FAKE_BROWSER, "--log", log]
+        with mock.patch.object(launcher.subprocess, 'Popen', wraps=subprocess.Popen) as popen:
+            launcher.WebbrowserLauncher(command).open_many(URLS)
+        self.assertEqual(popen.call_count, 1)
+        self.assertEqual(read_log(log, 2), URLS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from persistence import PersistenceWriter
+
+
+class PersistenceWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "settings.json")
+
+    def writer(self, **kwargs):
+        writer = PersistenceWriter(**kwargs)
+        self.addCleanup(writer.close)
+        return writer
+
+    def read(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_saves_inside_window_coalesce_into_one_write(self):
+        writer = self.writer(window=0.3)
+        written = []
+        for text in ("one", "two", "three"):
+            writer.schedule(self.path, text, lambda text=text: written.append(text))
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual((self.read(), writer.writes, writer.coalesced), ("three", 1, 2))
+        self.assertEqual(written, ["one", "two", "three"])  # Every caller hears about the write
+
+    def test_callable_data_is_built_at_write_time(self):
+        writer = self.writer(window=0.1)
+        state = ["old"]
+        writer.schedule(self.path, lambda: state[0])
+        state[0] = "new"
+        writer.flush()
+        self.assertEqual(self.read(), "new")
+
+    def test_writes_through_a_temp_file_and_replaces(self):
+        writer = self.writer(window=0)
+        replaced = []
+        real_replace = os.replace
+
+        def replace(src, dst):
+            replaced.append((src, dst, os.path.exists(src)))
+            real_replace(src, dst)
+
+        with mock.patch("persistence.os.replace", replace):
+            writer.schedule(self.path, "content")
+            writer.flush()
+        (src, dst, existed), = replaced
+        self.assertEqual((os.path.dirname(src), dst, existed), (self.folder, self.path, True))
+        self.assertTrue(src.endswith(".tmp"))
+        self.assertEqual(os.listdir(self.folder), ["settings.json"])
+
+    def test_failed_replace_keeps_old_file_and_no_temp(self):
+        writer = self.writer(window=0)
+        writer.schedule(self.path, "old")
+        writer.flush()
+        with mock.patch("persistence.os.replace", side_effect=OSError("disk full")):
+            writer.schedule(self.path, "new")
+            writer.flush()
+        self.assertEqual(self.read(), "old")
+        self.assertEqual(os.listdir(self.folder), ["settings.json"])
+        self.assertEqual(writer.drain_errors(), [(self.path, "disk full")])
+
+    def fsyncs(self, policy, close=False):
+        writer = self.writer(window=0, fsync=policy)
+        with mock.patch("persistence.os.fsync") as fsync:
+            writer.schedule(self.path, "a")
+            writer.flush()
+            flushed = fsync.call_count
+            if close:
+                writer.schedule(self.path, "b")
+                writer.close()
+        return flushed, fsync.call_count
+
+    def test_fsync_policies(self):
+        self.assertEqual(self.fsyncs("always"), (1, 1))
+        self.assertEqual(self.fsyncs("never", close=True), (0, 0))
+        self.assertEqual(self.fsyncs("exit", close=True), (0, 1))  # Only the write made on exit
+        self.assertEqual(self.writer(fsync="sometimes").fsync, "always")
+
+    def test_errors_are_queued_not_raised(self):
+        writer = self.writer(window=0)
+        missing = os.path.join(self.folder, "gone", "history.json")
+        writer.schedule(missing, "x")
+        writer.schedule(self.path, lambda: 1 / 0)
+        writer.schedule(os.path.join(self.folder, "ok.json"), "x", lambda: 1 / 0)
+        writer.flush()
+        errors = writer.drain_errors()
+        self.assertEqual(sorted(path for path, _ in errors),
+                         sorted([missing, self.path, os.path.join(self.folder, "ok.json")]))
+        self.assertEqual((writer.writes, writer.drain_errors()), (1, []))  # Only ok.json, drained once
+        self.assertFalse([name for name in os.listdir(self.folder) if name.endswith(".tmp")])
+
+
+if __name__ == "__main__":
+    unittest.main()
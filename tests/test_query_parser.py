@@ -0,0 +1,84 @@
+import unittest
+
+from engine_registry import EngineRegistry
+from query_parser import ShortcutTrie, parse_query
+
+REGISTRY = EngineRegistry.load()  # Built-in engines and groups only
+SHORTCUTS = ShortcutTrie.from_registry(REGISTRY)
+
+
+def parse(text):
+    query, chosen = parse_query(text, SHORTCUTS)
+    return query, [engine.id for engine in chosen]
+
+
+class BangTest(unittest.TestCase):
+
+    def test_trailing_and_leading_bangs(self):
+        self.assertEqual(parse("rust traits !so"), ("rust traits", ["stackoverflow"]))
+        self.assertEqual(parse("!so rust traits"), ("rust traits", ["stackoverflow"]))
+
+    def test_bang_case_insensitive(self):
+        self.assertEqual(parse("rust !SO"), ("rust", ["stackoverflow"]))
+
+    def test_several_engines_in_order_without_repeats(self):
+        self.assertEqual(parse("!yt !w lofi beats !youtube"), ("lofi beats", ["youtube", "wikipedia"]))
+
+    def test_position_id_and_alias(self):
+        self.assertEqual(parse("x !14")[1], ["stackoverflow"])
+        self.assertEqual(parse("x !stackoverflow")[1], ["stackoverflow"])
+        self.assertEqual(parse("x !1")[1], ["google"])  # Exact "1" beats the prefix of 10-19
+
+    def test_unambiguous_partial_shortcut(self):
+        self.assertEqual(parse("!stack borrow checker"), ("borrow checker", ["stackoverflow"]))
+
+    def test_ambiguous_partial_shortcut_stays_in_query(self):
+        # "s" starts stackoverflow, snapchat and spotify
+        self.assertEqual(parse("!s borrow"), ("!s borrow", []))
+
+    def test_group_fans_out(self):
+        self.assertEqual(parse("!dev segfault"), ("segfault", ["google", "stackoverflow", "reddit"]))
+
+    def test_unknown_bangs_are_query_text(self):
+        self.assertEqual(parse("what is !important"), ("what is !important", []))
+        self.assertEqual(parse("wow !"), ("wow !", []))
+        self.assertEqual(parse("c++ !zzz !so"), ("c++ !zzz", ["stackoverflow"]))
+
+    def test_spacing_kept_without_bangs(self):
+        self.assertEqual(parse("  a  b  "), ("a  b", []))
+
+
+class BacktickTest(unittest.TestCase):
+
+    def test_position_id_or_alias_suffix(self):
+        self.assertEqual(parse("rust traits`14"), ("rust traits", ["stackoverflow"]))
+        self.assertEqual(parse("rust traits` so"), ("rust traits", ["stackoverflow"]))
+        self.assertEqual(parse("segfault`dev")[1], ["google", "stackoverflow", "reddit"])
+
+    def test_combined_with_bang(self):
+        self.assertEqual(parse("!yt lofi`w"), ("lofi", ["youtube", "wikipedia"]))
+
+    def test_unknown_or_empty_suffix_kept(self):
+        self.assertEqual(parse("a`zzz"), ("a`zzz", []))
+        self.assertEqual(parse("a`"), ("a`", []))
+        self.assertEqual(parse("`14"), ("`14", []))
+
+
+class ShortcutTrieTest(unittest.TestCase):
+
+    def test_resolve(self):
+        self.assertIs(SHORTCUTS.resolve("WIKI"), REGISTRY.get("wikipedia"))
+        self.assertIsNone(SHORTCUTS.resolve(""))
+        self.assertIsNone(SHORTCUTS.resolve("nosuchengine"))
+
+    def test_first_exact_claim_kept(self):
+        trie = ShortcutTrie()
+        trie.insert("g", "google")
+        trie.insert("g", "gemini")
+        trie.insert("gem", "gemini")
+        self.assertEqual(trie.resolve("g"), "google")
+        self.assertEqual(trie.resolve("ge"), "gemini")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from readiness import DEFAULT_WAIT, SMOOTHING, WAIT_MARGIN, FakeProbe, WaitStats, wait_until_ready
+
+
+class FakeClock:
+    """Monotonic clock that only advances when slept on"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.sleeps += 1
+
+
+class WaitUntilReadyTest(unittest.TestCase):
+
+    def wait(self, probe, timeout):
+        clock = FakeClock()
+        return wait_until_ready(probe, timeout=timeout, interval=0.5, clock=clock,
+                                sleep=clock.sleep), clock
+
+    def test_ready_after_polls(self):
+        probe = FakeProbe(ready_after=3)
+        elapsed, clock = self.wait(probe, timeout=10)
+        self.assertEqual(elapsed, 1.5)
+        self.assertEqual((probe.polls, clock.sleeps), (4, 3))
+
+    def test_ready_at_once_does_not_sleep(self):
+        elapsed, clock = self.wait(FakeProbe(), timeout=10)
+        self.assertEqual((elapsed, clock.sleeps), (0.0, 0))
+
+    def test_timeout(self):
+        probe = FakeProbe(ready_after=100)
+        elapsed, clock = self.wait(probe, timeout=2)
+        self.assertIsNone(elapsed)
+        self.assertEqual(clock.now, 2.0)
+        self.assertEqual(probe.polls, 5)
+
+
+class WaitStatsTest(unittest.TestCase):
+
+    def test_unmeasured_engine_uses_default(self):
+        self.assertEqual(WaitStats().expected("ChatGPT"), DEFAULT_WAIT)
+
+    def test_expected_follows_observed_waits(self):
+        stats = WaitStats()
+        stats.record("ChatGPT", 2.0)
+        self.assertAlmostEqual(stats.expected("ChatGPT"), 2.0 * WAIT_MARGIN)
+        stats.record("ChatGPT", 4.0)
+        average = 2.0 + SMOOTHING * (4.0 - 2.0)
+        self.assertAlmostEqual(stats.expected("ChatGPT"), average * WAIT_MARGIN)
+        for _ in range(30):
+            stats.record("ChatGPT", 1.0)
+        self.assertAlmostEqual(stats.expected("ChatGPT"), 1.0 * WAIT_MARGIN, places=3)
+
+    def test_waits_persist(self):
+        path = os.path.join(tempfile.mkdtemp(), "engine_waits.json")
+        WaitStats(path).record("Gemini", 3.0)
+        self.assertAlmostEqual(WaitStats(path).expected("Gemini"), 3.0 * WAIT_MARGIN)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from persistence import PersistenceWriter
+from usage import UsageAggregate
+
+SEARCHES = [(100.0, "Google", "rust"), (101.0, "Bing", "Rust "), (102.0, "Google", "RUST")]
+
+
+class UsageJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "search_usage.json")
+        self.writer = PersistenceWriter(window=0)
+        self.addCleanup(self.writer.close)
+
+    def load(self, history=()):
+        self.writer.flush()  # Whatever the previous instance saved
+        usage = UsageAggregate.load(self.path, history, self.writer)
+        self.addCleanup(usage.close)
+        return usage
+
+    def counts(self, usage):
+        return {key: r.count for key, r in usage.records.items()}
+
+    def test_searches_append_to_journal_without_rewriting(self):
+        usage = self.load()
+        self.writer.flush()
+        writes = self.writer.writes
+        usage.record(SEARCHES)
+        self.writer.flush()
+        self.assertEqual(self.writer.writes, writes)
+        self.assertTrue(any(n.endswith('.journal') for n in os.listdir(self.folder)))
+
+    def test_reload_replays_journal(self):
+        usage = self.load()
+        usage.record(SEARCHES[:1])
+        usage.record(SEARCHES[1:])
+        usage.close()
+        reloaded = self.load()
+        self.assertEqual(self.counts(reloaded), {("Google", "rust"): 2, ("Bing", "rust"): 1})
+        self.assertEqual(reloaded.seq, 3)
+
+    def test_compaction_absorbs_journals(self):
+        usage = self.load()
+        usage.compact_threshold = 2
+        usage.record(SEARCHES)  # 3 journal records >= max(2, 2 records): compacts
+        self.writer.flush()
+        self.assertFalse([n for n in os.listdir(self.folder) if n.endswith('.journal')])
+        usage.record(SEARCHES[:1])
+        usage.close()
+        self.assertEqual(self.counts(self.load())[("Google", "rust")], 3)
+
+    def test_torn_journal_record_ignored(self):
+        usage = self.load()
+        usage.record(SEARCHES)
+        usage.close()
+        with open(usage.journal_path(usage.generation), 'a', encoding='utf-8') as f:
+            f.write('[103.0,"Goo')
+        reloaded = self.load()
+        self.assertEqual(reloaded.seq, 3)
+        reloaded.record(SEARCHES[:1])  # Goes to a fresh journal
+        reloaded.close()
+        self.assertEqual(self.load().seq, 4)
+
+    def test_first_load_builds_from_history(self):
+        self.assertEqual(self.load(SEARCHES).seq, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import re
+import time
+from datetime import date, datetime, timedelta
+
+# -- Timestamps --
+# History entries store epoch seconds (millisecond precision).  Older
+# versions stored only the local time of day ("%H:%M").  Those rows are
+# migrated best-effort: history is in chronological order, so walking back
+# from a reference moment (the file's modification time) a clock time later
+# than the one after it means the search happened on the previous day.
+
+LEGACY_FORMAT = "%H:%M"
+DISPLAY_FORMAT = "%Y-%m-%d %H:%M"
+DAY = timedelta(days=1)
+_RELATIVE = re.compile(r"^(\d+)\s*d$")
+
+
+def now():
+    """Timestamp for a search made right now"""
+    return round(time.time(), 3)
+
+
+def is_legacy(timestamp):
+    """Whether a timestamp is an old time-of-day string"""
+    return isinstance(timestamp, str)
+
+
+def _clock(text):
+    """(hour, minute) of a legacy timestamp, or None if unreadable"""
+    try:
+        parsed = datetime.strptime(text.strip(), LEGACY_FORMAT)
+    except ValueError:
+        return None
+    return parsed.hour, parsed.minute
+
+
+def migrate_entries(entries, reference):
+    """Entries with legacy clock times replaced by epoch seconds (oldest first)"""
+    entries = list(entries)
+    cursor = datetime.fromtimestamp(reference)
+    for i in range(len(entries) - 1, -1, -1):
+        timestamp = entries[i][0]
+        if not is_legacy(timestamp):
+            cursor = datetime.fromtimestamp(timestamp)
+            continue
+        clock = _clock(timestamp)
+        if clock is not None:
+            moment = cursor.replace(hour=clock[0], minute=clock[1], second=0, microsecond=0)
+            if moment > cursor:
+                moment -= DAY
+            cursor = moment
+        entries[i] = (cursor.timestamp(), *entries[i][1:])
+    return entries
+
+
+def migrate_timestamp(timestamp, reference):
+    """Epoch seconds for one timestamp: the latest matching moment not after reference"""
+    if not is_legacy(timestamp):
+        return timestamp
+    return migrate_entries([(timestamp,)], reference)[0][0]
+
+
+def format_timestamp(timestamp):
+    """Display form of a stored timestamp"""
+    if timestamp is None or is_legacy(timestamp):
+        return timestamp or ""
+    return datetime.fromtimestamp(timestamp).strftime(DISPLAY_FORMAT)
+
+
+def day_of(timestamp):
+    """Local calendar day (proleptic ordinal) of a timestamp"""
+    return date.fromtimestamp(timestamp).toordinal()
+
+
+def day_start(ordinal):
+    """Epoch seconds of local midnight starting a day ordinal"""
+    return datetime.combine(date.fromordinal(ordinal), datetime.min.time()).timestamp()
+
+
+def parse_day(text, today=None):
+    """Day ordinal for 'YYYY-MM-DD', 'today', 'yesterday' or 'Nd' (N days ago)
+
+    Returns None for empty text and raises ValueError for anything else
+    """
+    text = text.strip().lower()
+    if not text:
+        return None
+    today = today or date.today()
+    if text == "today":
+        return today.toordinal()
+    if text == "yesterday":
+        return today.toordinal() - 1
+    match = _RELATIVE.match(text)
+    if match:
+        return today.toordinal() - int(match.group(1))
+    return datetime.strptime(text, "%Y-%m-%d").date().toordinal()
+
@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+
+from autocomplete import DECAY, _add_log, normalize
+from history_store import encode_entry, iter_journal, journal_generations
+from timestamps import migrate_timestamp
+
+# -- Usage aggregate --
+# One record per distinct (engine, normalized query) with its use count,
+# first and last timestamps and a log-space frecency score (same decay as the
+# suggestion index).  Recording a search is a dict update, so the aggregate
+# stays current without rescanning history, and because it is saved to its own
+# file it keeps counting after old rows fall out of the capped history.
+# Like the history store, each search is appended to a journal
+# ("search_usage.json.<generation>.journal", one entry per line) that is
+# replayed on load; the full file is only rewritten once the journal holds as
+# many records as the aggregate, so saving stays O(1) amortized per search.
+
+FORMAT_VERSION = 2
+COMPACT_THRESHOLD = 1000  # Minimum journal records before the aggregate is rewritten
+
+
+class UsageRecord:
+    """Aggregated uses of one (engine, query) pair"""
+
+    __slots__ = ('engine', 'query', 'count', 'first_seen', 'last_seen', 'score', 'last_seq')
+
+    def __init__(self, engine, query, count=0, first_seen=None, last_seen=None,
+                 score=None, last_seq=0):
+        self.engine = engine
+        self.query = query  # Most recent original spelling
+        self.count = count
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.score = score  # log frecency, None before the first use
+        self.last_seq = last_seq
+
+    def to_list(self):
+        return [self.engine, self.query, self.count, self.first_seen, self.last_seen,
+                self.score, self.last_seq]
+
+
+class UsageAggregate:
+    """Deduplicated, incrementally updated usage counts over history"""
+
+    def __init__(self, path=None, writer=None, compact_threshold=COMPACT_THRESHOLD):
+        self.path = path
+        self.writer = writer
+        self.compact_threshold = compact_threshold
+        self.records = {}  # (engine, normalized query) -> UsageRecord
+        self.seq = 0  # Searches recorded so far
+        self.version = 0  # Bumped on every change, for cached views
+        self.generation = 0  # Journal that new searches are appended to
+        self.journal_records = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        self._most_used = (None, [])
+
+    @classmethod
+    def load(cls, path, history=(), writer=None):
+        """Read the saved aggregate plus its journals, or build it from history the first time"""
+        usage = cls(path, writer)
+        generations = journal_generations(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            usage.seq = data['seq']
+            absorbed = data.get('generation', 0)
+            saved_at = os.path.getmtime(path)
+            for row in data['records']:
+                record = UsageRecord(*row)
+                # Files from before epoch timestamps hold "%H:%M" times
+                record.first_seen = migrate_timestamp(record.first_seen, saved_at)
+                record.last_seen = migrate_timestamp(record.last_seen, saved_at)
+                usage.records[(record.engine, normalize(record.query))] = record
+        except (OSError, ValueError, KeyError, TypeError):
+            usage.records.clear()
+            usage.seq = 0
+            for entry in history:
+                usage._add(entry)
+            # Journals without a snapshot are already part of history
+            usage.generation = max([0, *generations])
+            usage.compact()
+            return usage
+        for generation in generations:
+            if generation > absorbed:
+                for entry in iter_journal(usage.journal_path(generation)):
+                    usage._add(entry)
+                    usage.journal_records += 1
+        # Start a fresh journal: the last one may end in a torn record
+        usage.generation = max([absorbed, *generations]) + 1
+        return usage
+
+    def journal_path(self, generation):
+        """Path of the journal file for a generation"""
+        return f"{self.path}.{generation}.journal"
+
+    def _add(self, entry):
+        """Count one (timestamp, engine, query) entry"""
+        timestamp, engine, query = entry[0], entry[1], entry[2]
+        norm = normalize(query)
+        if not norm:
+            return
+        weight = DECAY * self.seq
+        record = self.records.get((engine, norm))
+        if record is None:
+            # Published complete: query_totals may be reading on another thread
+            self.records[(engine, norm)] = UsageRecord(
+                engine, query.strip(), 1, timestamp, timestamp, weight, self.seq
+            )
+        else:
+            record.score = _add_log(record.score, weight)
+            record.count += 1
+            record.query = query.strip()
+            record.last_seen = timestamp
+            record.last_seq = self.seq
+        self.seq += 1
+        self.version += 1
+
+    def record(self, entries):
+        """Count newly recorded searches and append them to the journal"""
+        entries = list(entries)
+        for entry in entries:
+            self._add(entry)
+        if self.path is None or self.writer is None:
+            return
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path(self.generation), 'a', encoding='utf-8')
+            self._journal.write(''.join(encode_entry(entry) + '\n' for entry in entries))
+            self._journal.flush()
+            self.journal_records += len(entries)
+            # Rewriting costs O(records), so wait for as many journal records
+            due = self.journal_records >= max(self.compact_threshold, len(self.records))
+        if due:
+            self.compact()
+
+    def rebuild(self, entries):
+        """Recount from scratch in one pass over entries (after importing history)"""
+        self.records.clear()
+        self.seq = 0
+        for entry in entries:
+            self._add(entry)
+        self.version += 1
+        self.compact()
+
+    def clear(self):
+        """Forget all usage (when history is cleared)"""
+        self.records.clear()
+        self.seq = 0
+        self.version += 1
+        self.compact()
+
+    def compact(self, wait=False):
+        """Start a new journal and hand a snapshot of the aggregate to the writer"""
+        if self.path is None or self.writer is None:
+            return
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+            absorbed = self.generation
+            self.generation = absorbed + 1
+            self.journal_records = 0
+            data = {'version': FORMAT_VERSION, 'seq': self.seq, 'generation': absorbed,
+                    'records': [r.to_list() for r in self.records.values()]}
+        self.writer.schedule(
+            self.path,
+            lambda: json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+            on_written=lambda: self._drop_journals(absorbed)
+        )
+        if wait:
+            self.writer.flush()
+
+    def _drop_journals(self, absorbed):
+        """Delete journals whose searches are now in the saved aggregate"""
+        for generation in journal_generations(self.path):
+            if generation <= absorbed:
+                try:
+                    os.remove(self.journal_path(generation))
+                except OSError:
+                    pass
+
+    def close(self):
+        """Close the journal"""
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+    def most_used(self):
+        """Records by count, ties broken by recency (cached until the next change)"""
+        version, ranked = self._most_used
+        if version != self.version:
+            ranked = sorted(self.records.values(), key=lambda r: (r.count, r.last_seq), reverse=True)
+            self._most_used = (self.version, ranked)
+        return ranked
+
+    def query_totals(self):
+        """Per normalized query across engines: (display, count, log score, last seq)"""
+        totals = {}
+        for (_, norm), r in list(self.records.items()):  # Also runs on a background thread
+            current = totals.get(norm)
+            if current is None:
+                totals[norm] = (r.query, r.count, r.score, r.last_seq)
+            else:
+                display = r.query if r.last_seq > current[3] else current[0]
+                totals[norm] = (display, current[1] + r.count, _add_log(current[2], r.score),
+                                max(current[3], r.last_seq))
+        return totals
@@ -1,28 +1,49 @@
+import sys
+import startup_profile
+if "--profile-startup" in sys.argv:
+    startup_profile.enable()
+import instance
+# A repeat launch hands its request to the running widget and exits before
+# Tk, history or any other heavy module is loaded
+if __name__ == "__main__" and instance.forward(sys.argv[1:]):
+    sys.exit(0)
+# Headless modes run and exit here, before Tk or the stored history is touched
+import cli
+if __name__ == "__main__":
+    args = cli.parse_args()
+    code = cli.run_headless(args)
+    if code is not None:
+        sys.exit(code)
+
 import tkinter as tk
 from tkinter import ttk, messagebox
-import webbrowser
-import sys
-import keyboard
 import threading
-import pyautogui
 import time
 import json
 import os
-from datetime import datetime
-# Add pywin32 import for window focus
-try:
-    import win32gui
-    import win32con
-    import win32api
-except ImportError:
-    win32gui = win32con = win32api = None
-
-# Get the directory where the script is located
-WIDGET_DIR = os.path.dirname(os.path.abspath(__file__))
+import queue
+import atexit
+from autocomplete import PrefixIndex, normalize
+from fuzzy import FuzzyIndex
+from dispatch import SearchDispatcher
+from readiness import WaitStats
+from startup_profile import phase
+from history_view import VirtualList, format_entry, format_history_rows
+from timestamps import day_start, format_timestamp, parse_day
+from diagnostics import LatencyRecorder
+import loop_profile
+from search_core import (
+    SETTINGS_FILE, ENGINE_WAITS_FILE, ENGINES, SHORTCUTS, WRITER, USAGE, engines, history,
+    save_history, plan_search, build_searches, record_searches, correct_shortcut,
+    get_analytics, loaded_analytics
+)
+# Heavy or platform-specific modules (keyboard, pyautogui, webbrowser, pywin32)
+# are imported on first use or preloaded after the window is drawn
+PRELOAD_MODULES = ("webbrowser", "pyautogui")
+DID_YOU_MEAN_MIN = 4  # Typed characters before fuzzy "did you mean" suggestions
+HOTKEY_POLL_MS = 15  # How often the Tk loop checks for hotkey presses and forwarded requests
 
 # -- Configuration --
-MAX_HISTORY = 100  # Maximum number of history items to keep
-
 CONFIG = {
     'fonts': {
         'title': ('Segoe UI', 12, 'bold'),
@@ -45,67 +66,40 @@ CONFIG = {
     }
 }
 
-# -- File Paths --
-HISTORY_FILE = os.path.join(WIDGET_DIR, "search_history.json")
-SETTINGS_FILE = os.path.join(WIDGET_DIR, "widget_settings.json")
-
-# -- History Management --
-def load_history():
-    """Load search history from file"""
-    try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except:
-        pass
-    return []
-
-def save_history(history):
-    """Save search history to file"""
-    try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-    except:
-        pass
-
-# Load existing history
-history = load_history()
-
-# -- Engines with URL patterns and icons --
-engine_data = [
-    ("1. Google 🔍", "https://www.google.com/search?q={}"),
-    ("2. YouTube ▶️", "https://www.youtube.com/results?search_query={}"),
-    ("3. ChatGPT 🤖", "https://chat.openai.com/"),
-    ("4. Gemini 🌟", "https://gemini.google.com/"),
-    ("5. Bing 🌀", "https://www.bing.com/search?q={}"),
-    ("6. Facebook 📘", "https://www.facebook.com/search/top/?q={}"),
-    ("7. LinkedIn 💼", "https://www.linkedin.com/search/results/all/?keywords={}"),
-    ("8. Instagram 📸", "https://www.instagram.com/explore/tags/{}/"),
-    ("9. Twitter 🐦", "https://twitter.com/search?q={}"),
-    ("10. Reddit 👽", "https://www.reddit.com/search/?q={}"),
-    ("11. Pinterest 📌", "https://www.pinterest.com/search/pins/?q={}"),
-    ("12. Quora ❓", "https://www.quora.com/search?q={}"),
-    ("13. Amazon 🛒", "https://www.amazon.com/s?k={}"),
-    ("14. StackOverflow 💡", "https://stackoverflow.com/search?q={}"),
-    ("15. Wikipedia 📚", "https://en.wikipedia.org/wiki/{}"),
-    ("16. DuckDuckGo 🔐", "https://duckduckgo.com/?q={}"),
-    ("17. Yahoo 🗞️", "https://search.yahoo.com/search?p={}"),
-    ("18. Snapchat 👻", "https://www.snapchat.com/add/{}"),
-    ("19. Spotify 🎵", "https://open.spotify.com/search/{}"),
-    ("20. Netflix 🍿", "https://www.netflix.com/search?q={}")
-]
-
-engines = [e[0] for e in engine_data]
-
 class PremiumSearchWidget:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.settings = self.load_settings()
+    def __init__(self, server=None, remote_requests=None):
+        with phase("tk_root"):
+            self.root = tk.Tk()
+        with phase("load_settings"):
+            self.settings = self.load_settings()
         self.last_toggle_time = 0  # For debounce
-        self.setup_window()
-        self.create_widgets()
-        self.setup_bindings()
-        self.start_hotkey_listener()
+        self.hist_win = self.settings_win = self.diag_win = self.stats_win = None  # Built on first use, then reused
+        self.hist_mode = 'recent'  # History window rows: 'recent' searches or 'most_used' pairs
+        self.hist_filtered = None  # Rows matching the history filter, None when unfiltered
+        self.fuzzy_index = self.fuzzy_built = None  # Typo-tolerant index, built in the background
+        self.fuzzy_pending = []  # Queries searched while the fuzzy index was being built
+        self.hotkey_events = queue.Queue()  # perf_counter() of each press, from the keyboard thread
+        self.instance = server  # Single-instance server, None for a --new-instance widget
+        self.remote_requests = remote_requests or queue.Queue()  # Requests forwarded by later launches
+        self.hotkey_latency = LatencyRecorder("Hotkey to focused entry")
+        self.suggest_index = self.suggest_built = None  # Prefix index, built in the background
+        self.suggest_pending = []  # Queries searched while the prefix index was being built
+        with phase("start_suggest_index"):
+            self.start_suggest_index()
+        self.dispatcher = SearchDispatcher(
+            stats=WaitStats(ENGINE_WAITS_FILE),
+            timeout=self.settings['ai_ready_timeout']
+        )
+        with phase("setup_window"):
+            self.setup_window()
+        with phase("create_widgets"):
+            self.create_widgets()
+        with phase("setup_bindings"):
+            self.setup_bindings()
+        with phase("start_hotkey_listener"):
+            self.start_hotkey_listener()
+        self.poll_dispatch()
+        self.poll_events()
         
     def load_settings(self):
         """Load user settings"""
@@ -115,7 +109,12 @@ class PremiumSearchWidget:
             'auto_focus': True,
             'start_minimized': False,
             'max_history': 100,
-            'transparency': 0.95
+            'transparency': 0.95,
+            'history_backend': 'journal',
+            'ai_ready_timeout': 15,
+            'fsync_policy': 'always',
+            'launcher': 'webbrowser',
+            'devtools_port': 9222
         }
         
         try:
@@ -127,12 +126,8 @@ class PremiumSearchWidget:
         return default_settings
         
     def save_settings(self):
-        """Save user settings"""
-        try:
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(self.settings, f, indent=2)
-        except:
-            pass
+        """Queue user settings for the background writer (atomic, coalesced)"""
+        WRITER.schedule(SETTINGS_FILE, json.dumps(self.settings, indent=2))
         
     def setup_window(self):
         """Configure main window with premium styling"""
@@ -195,6 +190,9 @@ class PremiumSearchWidget:
         )
         self.entry.pack(fill="x", pady=(0, 4))
         
+        # Type-ahead suggestion dropdown (shown below the entry while typing)
+        self.create_suggestion_popup()
+        
         # Search button
         self.search_btn = tk.Button(
             search_frame,
@@ -210,13 +208,149 @@ class PremiumSearchWidget:
         )
         self.search_btn.pack(fill="x")
         
+    def create_suggestion_popup(self):
+        """Create the hidden autocomplete dropdown"""
+        self.suggest_win = tk.Toplevel(self.root)
+        self.suggest_win.overrideredirect(True)
+        self.suggest_win.attributes("-topmost", True)
+        self.suggest_win.withdraw()
+        
+        self.suggest_list = tk.Listbox(
+            self.suggest_win,
+            font=CONFIG['fonts']['body'],
+            bg=CONFIG['colors']['bg'],
+            fg=CONFIG['colors']['fg'],
+            selectbackground=CONFIG['colors']['accent'],
+            highlightbackground=CONFIG['colors']['accent'],
+            highlightthickness=1,
+            relief="flat",
+            bd=0,
+            activestyle="none",
+            height=0
+        )
+        self.suggest_list.pack(fill="both", expand=True)
+        self.suggest_list.bind("<ButtonRelease-1>", self.accept_suggestion)
+        
+    def update_suggestions(self, event=None):
+        """Refresh the dropdown with ranked matches for the typed prefix"""
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        text = self.entry.get()
+        index = self.get_suggest_index()
+        matches = index.suggest(text) if index is not None and text.strip() else []
+        if not matches:
+            matches = self.did_you_mean(text)
+        if not matches:
+            self.hide_suggestions()
+            return
+        self.suggest_list.delete(0, tk.END)
+        self.suggest_list.insert(tk.END, *matches)
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.suggest_win.geometry(f"{self.entry.winfo_width()}x{len(matches) * 20 + 2}+{x}+{y}")
+        self.suggest_win.deiconify()
+        self.suggest_win.lift()
+        
+    def did_you_mean(self, text):
+        """Corrections for a mistyped !bang or close matches from past queries"""
+        words = text.split()
+        if not words:
+            return []
+        last = words[-1]
+        if last.startswith("!") and len(last) > 2 and SHORTCUTS.resolve(last[1:]) is None:
+            fix = correct_shortcut(last[1:])
+            return [text[:text.rindex(last)] + "!" + fix] if fix else []
+        index = self.get_fuzzy_index()
+        if index is None or len(text.strip()) < DID_YOU_MEAN_MIN:
+            return []
+        return index.did_you_mean(text)
+        
+    def start_suggest_index(self):
+        """Rank the usage aggregate's queries for suggestions on a background thread"""
+        def build():
+            self.suggest_built = PrefixIndex.from_usage(USAGE)
+
+        threading.Thread(target=build, daemon=True).start()
+
+    def get_suggest_index(self):
+        """The prefix index once built (catching up on recent searches), else None"""
+        if self.suggest_index is None and self.suggest_built is not None:
+            for query in self.suggest_pending:
+                self.suggest_built.record(query)
+            self.suggest_pending = []
+            self.suggest_index = self.suggest_built
+        return self.suggest_index
+
+    def start_fuzzy_index(self):
+        """Build the fuzzy index from the usage aggregate on a background thread"""
+        records = list(USAGE.records.values())
+        
+        def build():
+            self.fuzzy_built = FuzzyIndex.from_texts([r.query for r in records],
+                                                     [r.count for r in records])
+            
+        threading.Thread(target=build, daemon=True).start()
+        
+    def get_fuzzy_index(self):
+        """The fuzzy index once built (catching up on recent searches), else None"""
+        if self.fuzzy_index is None and self.fuzzy_built is not None:
+            for query in self.fuzzy_pending:
+                self.fuzzy_built.add(query)
+            self.fuzzy_pending = []
+            self.fuzzy_index = self.fuzzy_built
+        return self.fuzzy_index
+        
+    def hide_suggestions(self, event=None):
+        """Hide the autocomplete dropdown"""
+        self.suggest_list.selection_clear(0, tk.END)
+        self.suggest_win.withdraw()
+        
+    def suggestions_visible(self):
+        """Whether the autocomplete dropdown is showing"""
+        return self.suggest_win.state() == "normal"
+        
+    def move_suggestion(self, step):
+        """Move the dropdown highlight up or down"""
+        size = self.suggest_list.size()
+        current = self.suggest_list.curselection()
+        index = (current[0] + step) % size if current else (0 if step > 0 else size - 1)
+        self.suggest_list.selection_clear(0, tk.END)
+        self.suggest_list.selection_set(index)
+        self.suggest_list.see(index)
+        
+    def on_entry_down(self, event=None):
+        """Down arrow: walk suggestions if shown, otherwise switch engine"""
+        if self.suggestions_visible():
+            self.move_suggestion(1)
+            return "break"
+        self.next_engine()
+        
+    def on_entry_up(self, event=None):
+        """Up arrow: walk suggestions if shown, otherwise switch engine"""
+        if self.suggestions_visible():
+            self.move_suggestion(-1)
+            return "break"
+        self.prev_engine()
+        
+    def accept_suggestion(self, event=None):
+        """Copy the highlighted suggestion into the entry"""
+        selection = self.suggest_list.curselection()
+        if not selection:
+            return
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, self.suggest_list.get(selection[0]))
+        self.entry.icursor(tk.END)
+        self.entry.focus_set()
+        self.hide_suggestions()
+        return "break"
+        
     def create_engine_section(self):
         """Create the engine selector area"""
         engine_frame = tk.Frame(self.inner_frame, bg=CONFIG['colors']['secondary'])
         engine_frame.pack(side="left", fill="y", padx=4, pady=6)
         
         # Engine variable
-        self.engine_var = tk.StringVar(value=engines[self.settings['default_engine']])
+        self.engine_var = tk.StringVar(value=self.default_engine_label())
         
         # Engine dropdown with custom styling
         self.dropdown = ttk.Combobox(
@@ -327,8 +461,12 @@ class PremiumSearchWidget:
         
         # Search functionality
         self.entry.bind("<Return>", self.search)
-        self.entry.bind("<Down>", self.next_engine)
-        self.entry.bind("<Up>", self.prev_engine)
+        self.entry.bind("<Down>", self.on_entry_down)
+        self.entry.bind("<Up>", self.on_entry_up)
+        self.entry.bind("<KeyRelease>", self.update_suggestions)
+        self.entry.bind("<Tab>", self.accept_suggestion)
+        self.entry.bind("<Escape>", self.hide_suggestions)
+        self.root.bind("<F12>", lambda e: self.show_diagnostics())
         
         # Button commands
         self.search_btn.config(command=self.search)
@@ -347,71 +485,108 @@ class PremiumSearchWidget:
         x = self.root.winfo_x() + (event.x - self.root.x)
         y = self.root.winfo_y() + (event.y - self.root.y)
         self.root.geometry(f"+{x}+{y}")
+        self.hide_suggestions()
         
     def search(self, event=None):
         """Perform search with current engine"""
-        query = self.entry.get().strip()
+        if self.suggestions_visible():
+            self.accept_suggestion()
+            self.hide_suggestions()
+        if self.run_query(self.entry.get(), ENGINES.get(self.engine_var.get())):
+            self.entry.delete(0, tk.END)
+            
+    def run_query(self, text, default_engine):
+        """Parse, record and dispatch one query; False if there was nothing to search"""
+        # Bang shortcuts (!yt, !so, ...) and the backtick suffix pick engines
+        query, chosen = plan_search(text.strip(), default_engine)
         if not query:
-            return
+            return False
             
-        chosen_engine = self.engine_var.get()
-        
-        # Handle quick selection with backtick
-        if "`" in query:
-            try:
-                base, idx_str = query.rsplit("`", 1)
-                idx = int(idx_str)
-                if 1 <= idx <= len(engine_data):
-                    chosen_engine = engines[idx - 1]
-                    query = base.strip()
-            except:
-                pass
-                
-        # Get engine data
-        engine_name = chosen_engine.split('. ')[1] if '. ' in chosen_engine else chosen_engine
-        idx = engines.index(chosen_engine)
-        name, url = engine_data[idx]
-        
         # Add to history
-        timestamp = datetime.now().strftime("%H:%M")
-        history.append((timestamp, name, query))
-        
-        # Keep only last MAX_HISTORY items
-        if len(history) > MAX_HISTORY:
-            history.pop(0)
-            
-        # Save history
-        save_history(history)
-        
-        # Perform search
-        if "chat.openai" in url or "gemini.google" in url:
-            webbrowser.open(url)
-            time.sleep(6)
-            pyautogui.click(x=500, y=500)
-            pyautogui.write(query)
-            pyautogui.press("enter")
+        record_searches(query, chosen)
+        index = self.get_suggest_index()
+        if index is not None:
+            index.record(query)
         else:
-            webbrowser.open(url.format(query))
-            
-        self.entry.delete(0, tk.END)
+            self.suggest_pending.append(query)
+        index = self.get_fuzzy_index()
+        if index is not None:
+            index.add(query)
+        else:
+            self.fuzzy_pending.append(query)
+        
+        # Perform search on the dispatch worker so the UI stays responsive;
+        # several engines go out as one fan-out job (one browser launch)
+        searches = build_searches(query, chosen)
+        label = searches[0][0] if len(searches) == 1 else f"{len(searches)} engines"
+        self.dispatcher.submit_batch(label, searches)
+        return True
+        
+    def handle_request(self, message):
+        """Carry out a request from the command line or a later launch"""
+        if message.get('action') == 'search':
+            key = message.get('engine')
+            engine = ENGINES.get(str(key)) if key else ENGINES.get(self.engine_var.get())
+            if engine is None:
+                self.search_btn.config(text=f"⚠️ Unknown engine: {key}")
+                return
+            self.run_query(str(message.get('query', '')), engine)
+        elif self.root.state() != "normal":
+            self.toggle_visibility()
+        else:
+            self.root.lift()
+            self.entry.focus_set()
+        
+    def poll_dispatch(self):
+        """Show dispatch progress and any load or background save errors"""
+        events = self.dispatcher.drain()
+        if events:
+            _, label, status = events[-1]
+            if self.dispatcher.pending:
+                self.search_btn.config(text=f"⏳ {label}: {status} ({self.dispatcher.pending})")
+            elif status.startswith("failed"):
+                self.search_btn.config(text=f"⚠️ {label}: {status}")
+            else:
+                self.search_btn.config(text="🔍 Search")
+        errors = WRITER.drain_errors()
+        if errors:
+            messagebox.showerror(
+                "Error",
+                "\n".join(f"{os.path.basename(path)}: {message}" for path, message in errors)
+            )
+        self.root.after(100, self.poll_dispatch)
+        
+    def default_engine_label(self):
+        """Dropdown label of the configured default engine"""
+        index = self.settings['default_engine']
+        return engines[index if 0 <= index < len(engines) else 0]
         
     def next_engine(self, event=None):
         """Switch to next search engine"""
-        current = engines.index(self.engine_var.get())
+        current = ENGINES.get(self.engine_var.get()).position - 1
         self.engine_var.set(engines[(current + 1) % len(engines)])
         
     def prev_engine(self, event=None):
         """Switch to previous search engine"""
-        current = engines.index(self.engine_var.get())
+        current = ENGINES.get(self.engine_var.get()).position - 1
         self.engine_var.set(engines[(current - 1) % len(engines)])
         
     def show_history(self):
-        """Display search history in a new window with clickable search"""
+        """Display search history in a reusable window with clickable search"""
         if not history:
             messagebox.showinfo("History", "No search history found.")
             return
             
-        hist_win = tk.Toplevel(self.root)
+        if self.hist_win is None:
+            self.create_history_window()
+        self.apply_history_filter()
+        self.hist_win.deiconify()
+        self.hist_win.lift()
+        
+    def create_history_window(self):
+        """Build the history window once; closing it only hides it"""
+        self.hist_win = hist_win = tk.Toplevel(self.root)
+        hist_win.protocol("WM_DELETE_WINDOW", hist_win.withdraw)
         hist_win.title("Search History")
         hist_win.geometry("600x500")
         hist_win.configure(bg=CONFIG['colors']['bg'])
@@ -443,56 +618,169 @@ class PremiumSearchWidget:
         )
         clear_btn.pack(side="right")
         
-        # History listbox with scrollbar
-        hist_frame = tk.Frame(hist_win, bg=CONFIG['colors']['bg'])
-        hist_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
-        
-        # Create listbox and scrollbar
-        hist_listbox = tk.Listbox(
-            hist_frame,
-            font=CONFIG['fonts']['body'],
-            bg=CONFIG['colors']['secondary'],
+        # Recent / most used toggle
+        self.hist_mode_btn = tk.Button(
+            header_frame,
+            text="📈 Most used",
+            font=CONFIG['fonts']['small'],
+            bg=CONFIG['colors']['accent'],
             fg=CONFIG['colors']['fg'],
-            selectbackground=CONFIG['colors']['accent'],
             relief="flat",
             bd=0,
-            height=20
+            cursor="hand2",
+            command=self.toggle_history_mode
         )
-        hist_listbox.pack(side="left", fill="both", expand=True)
-        
-        scrollbar = tk.Scrollbar(hist_frame, orient="vertical", command=hist_listbox.yview)
-        scrollbar.pack(side="right", fill="y")
-        hist_listbox.config(yscrollcommand=scrollbar.set)
+        self.hist_mode_btn.pack(side="right", padx=(0, 5))
         
-        # Populate history
-        for timestamp, engine, query in history[-MAX_HISTORY:]:
-            hist_listbox.insert(0, f"[{timestamp}] {engine}: {query}")
-            
-        # Double-click to search
-        hist_listbox.bind("<Double-Button-1>", lambda e: self.search_from_history(hist_listbox, hist_win))
+        # Usage analytics
+        tk.Button(
+            header_frame,
+            text="📊 Stats",
+            font=CONFIG['fonts']['small'],
+            bg=CONFIG['colors']['accent'],
+            fg=CONFIG['colors']['fg'],
+            relief="flat",
+            bd=0,
+            cursor="hand2",
+            command=self.show_analytics
+        ).pack(side="right", padx=(0, 5))
+        
+        # Typo-tolerant filter
+        filter_frame = tk.Frame(hist_win, bg=CONFIG['colors']['bg'])
+        filter_frame.pack(fill="x", padx=10, pady=(0, 5))
+        tk.Label(filter_frame, text="🔎", font=CONFIG['fonts']['body'],
+                bg=CONFIG['colors']['bg'], fg=CONFIG['colors']['fg']).pack(side="left")
+        self.hist_filter_var = tk.StringVar()
+        filter_entry = tk.Entry(filter_frame, textvariable=self.hist_filter_var,
+                                font=CONFIG['fonts']['body'], bg=CONFIG['colors']['secondary'],
+                                fg=CONFIG['colors']['fg'], insertbackground=CONFIG['colors']['fg'],
+                                relief="flat")
+        filter_entry.pack(side="left", fill="x", expand=True, padx=(5, 0))
+        filter_entry.bind("<KeyRelease>", self.apply_history_filter)
+        
+        # Date range: YYYY-MM-DD, today, yesterday or Nd (N days ago); either side may be empty
+        self.hist_range_vars = []
+        self.hist_range_entries = []
+        for label in ("From", "To"):
+            tk.Label(filter_frame, text=label, font=CONFIG['fonts']['small'],
+                    bg=CONFIG['colors']['bg'], fg=CONFIG['colors']['fg']).pack(side="left", padx=(8, 3))
+            var = tk.StringVar()
+            entry = tk.Entry(filter_frame, textvariable=var, width=11,
+                             font=CONFIG['fonts']['body'], bg=CONFIG['colors']['secondary'],
+                             fg=CONFIG['colors']['fg'], insertbackground=CONFIG['colors']['fg'],
+                             relief="flat")
+            entry.pack(side="left")
+            entry.bind("<KeyRelease>", self.apply_history_filter)
+            self.hist_range_vars.append(var)
+            self.hist_range_entries.append(entry)
+        
+        # Virtualized history list: only the visible rows exist as widgets
+        self.hist_view = VirtualList(
+            hist_win,
+            size=self.history_row_count,
+            fetch=self.format_history_rows,
+            on_activate=self.search_from_history,
+            font=CONFIG['fonts']['body'],
+            bg=CONFIG['colors']['secondary'],
+            fg=CONFIG['colors']['fg'],
+            select_bg=CONFIG['colors']['accent']
+        )
+        self.hist_view.pack(fill="both", expand=True, padx=10, pady=(0, 10))
         
         # Instructions
         instructions = tk.Label(
             hist_win,
-            text="💡 Double-click any item to search again",
+            text="💡 Double-click (or select and press Enter) to search again",
             font=CONFIG['fonts']['small'],
             bg=CONFIG['colors']['bg'],
             fg=CONFIG['colors']['success']
         )
         instructions.pack(pady=(0, 10))
         
-    def search_from_history(self, listbox, window):
-        """Search from history item"""
-        try:
-            selection = listbox.get(listbox.curselection())
-            # Extract query from history item
-            query = selection.split(": ", 1)[1]
-            self.entry.delete(0, tk.END)
-            self.entry.insert(0, query)
-            window.destroy()
-            self.search()
-        except:
-            pass
+    def toggle_history_mode(self):
+        """Switch the history window between recent searches and most used pairs"""
+        self.hist_mode = 'most_used' if self.hist_mode == 'recent' else 'recent'
+        self.hist_mode_btn.config(text="🕘 Recent" if self.hist_mode == 'most_used' else "📈 Most used")
+        self.apply_history_filter()
+        
+    def apply_history_filter(self, event=None):
+        """Keep the rows in the date range whose query contains or nearly matches the filter text"""
+        key = normalize(self.hist_filter_var.get())
+        start, end = self.history_range()
+        if not key and start is None and end is None:
+            self.hist_filtered = None
+            self.hist_view.reset()
+            return
+        if key:
+            index = self.get_fuzzy_index()
+            close = {k for _, k in index.matches(key)} if index else set()
+            
+            def keep(query):
+                norm = normalize(query)
+                return key in norm or norm in close
+        else:
+            keep = None
+            
+        if self.hist_mode == 'most_used':
+            rows = [r for r in USAGE.most_used()
+                    if (start is None or r.last_seen >= start) and (end is None or r.last_seen < end)]
+            self.hist_filtered = [r for r in rows if keep(r.query)] if keep else rows
+        else:
+            # The day index reads only the days in range
+            rows = history.between(start, end) if start is not None or end is not None else reversed(history)
+            self.hist_filtered = [e for e in rows if keep(e[2])] if keep else list(rows)
+        self.hist_view.reset()
+        
+    def history_range(self):
+        """(start, end) epoch bounds from the From/To boxes; unreadable boxes are flagged and ignored"""
+        bounds = []
+        for side, (var, entry) in enumerate(zip(self.hist_range_vars, self.hist_range_entries)):
+            try:
+                day = parse_day(var.get())
+                # "To" includes its whole day, so it ends at the next midnight
+                bounds.append(None if day is None else day_start(day + side))
+                entry.config(fg=CONFIG['colors']['fg'])
+            except ValueError:
+                bounds.append(None)
+                entry.config(fg=CONFIG['colors']['warning'])
+        return tuple(bounds)
+        
+    def history_rows(self):
+        """Rows of the current mode and filter, newest or most used first"""
+        if self.hist_filtered is not None:
+            return self.hist_filtered
+        if self.hist_mode == 'most_used':
+            return USAGE.most_used()
+        return None  # Unfiltered recent rows are read from history directly
+        
+    def history_row_count(self):
+        """Number of rows in the current history mode"""
+        rows = self.history_rows()
+        return len(history) if rows is None else len(rows)
+        
+    def format_history_rows(self, start, stop):
+        """Display strings for history rows start..stop in the current mode"""
+        rows = self.history_rows()
+        if rows is None:
+            return format_history_rows(history, start, stop)
+        if self.hist_mode == 'most_used':
+            return [f"{r.count}× {r.engine}: {r.query}  (last {format_timestamp(r.last_seen)})"
+                    for r in rows[start:stop]]
+        return [format_entry(e) for e in rows[start:stop]]
+        
+    def search_from_history(self, index):
+        """Search again for the history row at index (0 is newest)"""
+        rows = self.history_rows()
+        if self.hist_mode == 'most_used':
+            record = rows[index]
+            self.hist_win.withdraw()
+            self.run_query(record.query, ENGINES.get(record.engine) or ENGINES.get(self.engine_var.get()))
+            return
+        query = (history[len(history) - 1 - index] if rows is None else rows[index])[2]
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, query)
+        self.hist_win.withdraw()
+        self.search()
             
     def clear_history(self, window):
         """Clear all search history"""
@@ -500,12 +788,66 @@ class PremiumSearchWidget:
             global history
             history.clear()
             save_history(history)
-            window.destroy()
+            USAGE.clear()
+            if loaded_analytics() is not None:
+                loaded_analytics().clear()
+            self.suggest_index, self.suggest_built, self.suggest_pending = PrefixIndex(), None, []
+            self.fuzzy_index, self.fuzzy_built, self.fuzzy_pending = FuzzyIndex(), None, []
+            self.apply_history_filter()
+            window.withdraw()
             messagebox.showinfo("History", "Search history cleared.")
             
+    def show_analytics(self):
+        """Show engine, time-of-day and top-query statistics in a reusable window"""
+        if self.stats_win is None:
+            self.stats_win = tk.Toplevel(self.root)
+            self.stats_win.protocol("WM_DELETE_WINDOW", self.stats_win.withdraw)
+            self.stats_win.title("Search Analytics")
+            self.stats_win.configure(bg=CONFIG['colors']['bg'])
+            tk.Label(self.stats_win, text="📊 Search Analytics", font=CONFIG['fonts']['title'],
+                    bg=CONFIG['colors']['bg'], fg=CONFIG['colors']['success']).pack(anchor="w", padx=10, pady=10)
+            self.stats_text = tk.Label(self.stats_win, justify="left", anchor="w", font=("Consolas", 9),
+                                       bg=CONFIG['colors']['bg'], fg=CONFIG['colors']['fg'])
+            self.stats_text.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.stats_win.deiconify()
+        self.stats_win.lift()
+        analytics = loaded_analytics()
+        if analytics is not None:
+            self.stats_text.config(text="\n".join(analytics.report_lines()))
+            return
+        # First use: one pass over the stored history, off the Tk thread
+        self.stats_text.config(text="Computing statistics…")
+        results = queue.Queue()
+        threading.Thread(target=lambda: results.put(get_analytics()), daemon=True).start()
+        
+        def wait_for_results():
+            try:
+                analytics = results.get_nowait()
+            except queue.Empty:
+                self.root.after(100, wait_for_results)
+                return
+            self.stats_text.config(text="\n".join(analytics.report_lines()))
+            
+        wait_for_results()
+        
     def show_settings(self):
-        """Show comprehensive settings window"""
-        settings_win = tk.Toplevel(self.root)
+        """Show the settings window, loading the current values into it"""
+        if self.settings_win is None:
+            self.create_settings_window()
+        ui_vars = self.settings_vars
+        ui_vars['hotkey'].set(self.settings['hotkey'])
+        ui_vars['engine'].set(self.default_engine_label())
+        ui_vars['auto_focus'].set(self.settings['auto_focus'])
+        ui_vars['start_minimized'].set(self.settings['start_minimized'])
+        ui_vars['max_history'].set(str(self.settings['max_history']))
+        ui_vars['transparency'].set(self.settings['transparency'])
+        self.settings_win.deiconify()
+        self.settings_win.lift()
+        
+    def create_settings_window(self):
+        """Build the settings window once; closing it only hides it"""
+        self.settings_win = settings_win = tk.Toplevel(self.root)
+        settings_win.protocol("WM_DELETE_WINDOW", lambda: self.cancel_settings(settings_win))
         settings_win.title("Settings")
         settings_win.geometry("500x600")
         settings_win.configure(bg=CONFIG['colors']['bg'])
@@ -554,7 +896,7 @@ class PremiumSearchWidget:
                                    fg=CONFIG['colors']['success'])
         engine_frame.pack(fill="x", padx=10, pady=5)
         
-        engine_var = tk.StringVar(value=engines[self.settings['default_engine']])
+        engine_var = tk.StringVar(value=self.default_engine_label())
         engine_dropdown = ttk.Combobox(engine_frame, textvariable=engine_var, 
                                      values=engines, font=CONFIG['fonts']['body'], state="readonly")
         engine_dropdown.pack(fill="x", padx=5, pady=2)
@@ -636,14 +978,26 @@ class PremiumSearchWidget:
         canvas.pack(side="left", fill="both", expand=True, padx=10, pady=10)
         scrollbar.pack(side="right", fill="y")
         
+        self.settings_vars = {
+            'hotkey': hotkey_var,
+            'engine': engine_var,
+            'auto_focus': auto_focus_var,
+            'start_minimized': start_minimized_var,
+            'max_history': max_history_var,
+            'transparency': transparency_var
+        }
+        
     def save_settings_from_ui(self, hotkey, engine, auto_focus, start_minimized, max_history, transparency, window):
         """Save settings from UI"""
         try:
+            if int(max_history) < 1:
+                raise ValueError("Max history must be at least 1")
             self.settings['hotkey'] = hotkey
-            self.settings['default_engine'] = engines.index(engine)
+            self.settings['default_engine'] = ENGINES.get(engine).position - 1
             self.settings['auto_focus'] = auto_focus
             self.settings['start_minimized'] = start_minimized
             self.settings['max_history'] = int(max_history)
+            history.resize(self.settings['max_history'])
             self.settings['transparency'] = transparency
             
             # Apply settings immediately
@@ -651,35 +1005,41 @@ class PremiumSearchWidget:
             
             self.save_settings()
             messagebox.showinfo("Settings", "Settings saved successfully!")
-            window.destroy()
+            window.withdraw()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
             
     def cancel_settings(self, window):
         """Cancel settings and restore original values"""
         self.root.attributes('-alpha', self.settings['transparency'])
-        window.destroy()
+        window.withdraw()
         
     def bring_to_foreground(self):
         """Force the widget window to the foreground using pywin32 (Windows only)"""
-        if win32gui and win32con and win32api:
-            try:
-                hwnd = self.root.winfo_id()
-                win32gui.ShowWindow(hwnd, win32con.SW_SHOWNORMAL)
-                # ALT key workaround
-                win32api.keybd_event(win32con.VK_MENU, 0, 0, 0)
-                win32gui.SetForegroundWindow(hwnd)
-                win32api.keybd_event(win32con.VK_MENU, 0, win32con.KEYEVENTF_KEYUP, 0)
-            except Exception as e:
-                pass
-        
-    def toggle_visibility(self):
-        """Toggle widget visibility with debounce"""
+        try:
+            import win32gui
+            import win32con
+            import win32api
+        except ImportError:
+            return
+        try:
+            hwnd = self.root.winfo_id()
+            win32gui.ShowWindow(hwnd, win32con.SW_SHOWNORMAL)
+            # ALT key workaround
+            win32api.keybd_event(win32con.VK_MENU, 0, 0, 0)
+            win32gui.SetForegroundWindow(hwnd)
+            win32api.keybd_event(win32con.VK_MENU, 0, win32con.KEYEVENTF_KEYUP, 0)
+        except Exception as e:
+            pass
+        
+    def toggle_visibility(self, pressed_at=None):
+        """Toggle widget visibility with debounce; pressed_at times a hotkey press"""
         now = time.time()
         if now - getattr(self, 'last_toggle_time', 0) < 0.3:  # 300ms debounce
             return
         self.last_toggle_time = now
         if self.root.state() == "normal":
+            self.hide_suggestions()
             self.root.withdraw()
         else:
             self.root.deiconify()
@@ -689,26 +1049,112 @@ class PremiumSearchWidget:
             self.entry.focus_set()  # Always focus the entry
             self.root.after(10, lambda: self.root.attributes('-topmost', False))  # Reset topmost after ensuring focus
             self.bring_to_foreground()  # Use pywin32 to force foreground
+            if pressed_at is not None:
+                # Idle callbacks run once the pending redraws are done
+                self.root.after_idle(lambda: self.record_hotkey_latency(pressed_at))
+            
+    def record_hotkey_latency(self, pressed_at):
+        """Record the press-to-usable delay if the entry really got focus"""
+        if self.root.focus_get() is self.entry:
+            self.hotkey_latency.record(time.perf_counter() - pressed_at)
             
     def start_hotkey_listener(self):
         """Start hotkey listener in background thread"""
         def listen_toggle():
-            keyboard.add_hotkey(self.settings['hotkey'], self.toggle_visibility)
+            import keyboard
+            # Tk is not thread-safe: only queue the press, the Tk loop handles it
+            keyboard.add_hotkey(self.settings['hotkey'],
+                                lambda: self.hotkey_events.put(time.perf_counter()))
             keyboard.wait()
             
         threading.Thread(target=listen_toggle, daemon=True).start()
         
+    def poll_events(self):
+        """Handle hotkey presses and forwarded requests queued by other threads"""
+        while True:
+            try:
+                pressed_at = self.hotkey_events.get_nowait()
+            except queue.Empty:
+                break
+            self.toggle_visibility(pressed_at)
+        while True:
+            try:
+                message = self.remote_requests.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_request(message)
+        self.root.after(HOTKEY_POLL_MS, self.poll_events)
+        
+    def show_diagnostics(self):
+        """Show latency diagnostics in a reusable window"""
+        if self.diag_win is None:
+            self.diag_win = tk.Toplevel(self.root)
+            self.diag_win.protocol("WM_DELETE_WINDOW", self.diag_win.withdraw)
+            self.diag_win.title("Diagnostics")
+            self.diag_win.configure(bg=CONFIG['colors']['bg'])
+            tk.Label(self.diag_win, text="🩺 Diagnostics", font=CONFIG['fonts']['title'],
+                    bg=CONFIG['colors']['bg'], fg=CONFIG['colors']['success']).pack(anchor="w", padx=10, pady=10)
+            self.diag_text = tk.Label(self.diag_win, justify="left", font=CONFIG['fonts']['body'],
+                                      bg=CONFIG['colors']['bg'], fg=CONFIG['colors']['fg'])
+            self.diag_text.pack(anchor="w", padx=10, pady=(0, 10))
+            tk.Button(self.diag_win, text="Refresh", font=CONFIG['fonts']['small'],
+                     bg=CONFIG['colors']['accent'], fg=CONFIG['colors']['fg'],
+                     relief="flat", bd=0, cursor="hand2",
+                     command=self.show_diagnostics).pack(side="right", padx=(0, 10), pady=(0, 10))
+            if loop_profile.enabled:
+                tk.Button(self.diag_win, text="Print loop report", font=CONFIG['fonts']['small'],
+                         bg=CONFIG['colors']['accent'], fg=CONFIG['colors']['fg'],
+                         relief="flat", bd=0, cursor="hand2",
+                         command=loop_profile.report).pack(side="right", padx=(0, 5), pady=(0, 10))
+        self.diag_text.config(text="\n".join(self.diagnostics_lines()))
+        self.diag_win.deiconify()
+        self.diag_win.lift()
+        
+    def diagnostics_lines(self):
+        """Text lines for the diagnostics window"""
+        return [self.hotkey_latency.summary(), "", *loop_profile.summary_lines()]
+        
     def quit_app(self):
         """Use the same toggle behavior as the hotkey"""
         self.toggle_visibility()
         
+    def preload_modules(self):
+        """Import modules needed by later searches on a background thread"""
+        def preload():
+            for name in PRELOAD_MODULES:
+                try:
+                    __import__(name)
+                except Exception:
+                    pass
+                    
+        threading.Thread(target=preload, daemon=True).start()
+        
+    def report_startup(self):
+        """Print the --profile-startup report once the entry is interactive"""
+        self.entry.focus_set()
+        self.root.update_idletasks()
+        startup_profile.report()
+        
     def run(self):
         """Start the application"""
         if self.settings['start_minimized']:
             self.root.withdraw()
+        if startup_profile.enabled:
+            self.root.after_idle(self.report_startup)
+        self.root.after(500, self.preload_modules)
+        self.root.after(600, self.start_fuzzy_index)
         self.root.mainloop()
 
 # -- Main execution --
 if __name__ == "__main__":
-    app = PremiumSearchWidget()
+    if args.profile_loop:
+        loop_profile.enable(args.stall_ms)
+        atexit.register(loop_profile.report)
+    remote_requests = queue.Queue()
+    server = instance.InstanceServer.start(remote_requests.put)
+    if server is None and not args.new_instance and instance.forward_when_ready(sys.argv[1:]):
+        sys.exit(0)  # Another launch won the race for the port and took this request
+    app = PremiumSearchWidget(server, remote_requests)
+    if args.query:
+        app.root.after_idle(lambda: app.handle_request(instance.request_from_args(args)))
     app.run()